@@ -0,0 +1,146 @@
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from config_translator import ConfigParser, write_translation
+
+# Сценарии: каждый нагружает свою часть транслятора
+SCENARIOS = {
+    'variables': dict(variables=5000, expressions=100),
+    'arrays': dict(variables=10, arrays=20, array_length=20000, expressions=100),
+    'nested': dict(variables=100, expressions=2000, nesting=30),
+    'comments': dict(variables=100, expressions=100, comment_blocks=500, comment_lines=40),
+    'mixed': dict(variables=2000, arrays=10, array_length=5000, expressions=1000,
+                  nesting=10, comment_blocks=100, comment_lines=20),
+}
+
+def generate_config(variables=1000, arrays=0, array_length=1000, expressions=100,
+                    nesting=3, comment_blocks=0, comment_lines=10, seed=0):
+    """Генерирует синтетический конфигурационный файл заданного размера."""
+    rng = random.Random(seed)
+    lines = ['! Синтетическая конфигурация для бенчмарка']
+
+    for i in range(comment_blocks):
+        lines.append('=begin')
+        lines.extend(f'Комментарий {i}, строка {j}' for j in range(comment_lines))
+        lines.append('=end')
+
+    for i in range(variables):
+        if rng.random() < 0.5:
+            lines.append(f'var v{i} = {rng.randint(-1000, 1000)};')
+        else:
+            lines.append(f'var v{i} = {rng.uniform(-1000, 1000):.3f};')
+        if i % 50 == 0:
+            lines.append(f'! Группа параметров {i // 50}')
+
+    for i in range(arrays):
+        values = ', '.join(str(rng.randint(-10000, 10000)) for _ in range(array_length))
+        lines.append(f'var a{i} = {{ {values} }};')
+
+    operators = ['+', '-', '*']
+    for i in range(expressions):
+        if arrays and i % 10 == 0:
+            array_name = f'a{rng.randrange(arrays)}'
+            reduction = rng.choice(['sum', 'min', 'max', 'mean'])
+            lines.append(f'[e{i}: {reduction}({array_name} * 2 + 1)]')
+            continue
+        expr = f'v{rng.randrange(variables)}'
+        for _ in range(nesting):
+            expr = f'({expr} {rng.choice(operators)} v{rng.randrange(variables)})'
+        lines.append(f'[e{i}: {expr}]')
+
+    return '\n'.join(lines) + '\n'
+
+class _NullWriter:
+    """Файл, который отбрасывает данные: замеряется только форматирование TOML."""
+
+    def write(self, text):
+        pass
+
+def _new_parser(lines):
+    parser = ConfigParser()
+    parser.lines = lines
+    return parser
+
+def benchmark_scenario(name, params, repeat=3):
+    """Измеряет разбор, вычисление выражений, запись TOML и пиковую память."""
+    source = generate_config(**params)
+    lines = [line.strip() for line in source.splitlines()]
+
+    parse_time = float('inf')
+    for _ in range(repeat):
+        parser = _new_parser(lines)
+        start = time.perf_counter()
+        parser.parse()
+        parse_time = min(parse_time, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for expr in parser.expressions.values():
+        parser.evaluate_expression(expr)
+    eval_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    write_translation(_NullWriter(), parser)
+    write_time = time.perf_counter() - start
+
+    tracemalloc.start()
+    _new_parser(lines).parse()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    expression_count = max(len(parser.expressions), 1)
+    return {
+        'scenario': name,
+        'lines': len(lines),
+        'source_bytes': len(source.encode('utf-8')),
+        'variables': len(parser.variables),
+        'expressions': len(parser.expressions),
+        'parse_seconds': parse_time,
+        'lines_per_second': len(lines) / parse_time,
+        'expression_eval_us': eval_time / expression_count * 1e6,
+        'write_seconds': write_time,
+        'peak_memory_bytes': peak_memory,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк транслятора конфигураций')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                        help='Сценарий (можно указать несколько, по умолчанию все)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Множитель размера сгенерированных файлов')
+    parser.add_argument('--repeat', type=int, default=3, help='Число повторов замера разбора')
+    parser.add_argument('--json', help='Сохранить результаты в JSON файл')
+    parser.add_argument('--generate',
+                        help='Только сгенерировать файл сценария по этому пути (нужен ровно один --scenario)')
+    args = parser.parse_args()
+    if args.generate and len(args.scenario or ()) != 1:
+        parser.error('--generate требует ровно один --scenario')
+
+    results = []
+    for name in args.scenario or sorted(SCENARIOS):
+        params = dict(SCENARIOS[name])
+        for key in ('variables', 'arrays', 'array_length', 'expressions', 'comment_blocks'):
+            if key in params:
+                params[key] = max(1, int(params[key] * args.scale))
+
+        if args.generate:
+            with open(args.generate, 'w', encoding='utf-8') as f:
+                f.write(generate_config(**params))
+            print(f"Сценарий {name} сохранён в {args.generate}")
+            return
+
+        result = benchmark_scenario(name, params, args.repeat)
+        results.append(result)
+        print(f"{name:>10}: {result['lines']:>8} строк, "
+              f"{result['lines_per_second']:>12,.0f} строк/с, "
+              f"выражение {result['expression_eval_us']:>8.1f} мкс, "
+              f"запись {result['write_seconds'] * 1000:>8.1f} мс, "
+              f"пик памяти {result['peak_memory_bytes'] / 1024 / 1024:>7.1f} МБ")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,236 @@
 import argparse
+import glob
+import hashlib
+import io
+import operator
 import re
+import shutil
 import sys
-import tomli_w
 import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+# Версия транслятора входит в ключ кеша: при изменении формата вывода старые записи не используются
+TRANSLATOR_VERSION = '1.3'
+
+# Первая строка выходного файла хранит ключ трансляции, по нему пропускаются неизменённые входы
+HASH_HEADER = '# translation-sha256: '
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'config_translator')
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+
+# Массивы записываются порциями, чтобы не строить строку со всем массивом сразу
+ARRAY_CHUNK_SIZE = 4096
+
+# Формат вывода совпадает с tomli_w: ключи без кавычек и экранирование строк
+BARE_KEY = re.compile(r'[A-Za-z0-9_-]+')
+ILLEGAL_STRING_CHARS = re.compile(r'[\x00-\x08\x0a-\x1f\x7f"\\]')
+STRING_ESCAPES = {'\b': '\\b', '\n': '\\n', '\f': '\\f', '\r': '\\r', '"': '\\"', '\\': '\\\\'}
+
+# Операции, результат которых для целочисленных массивов остаётся целочисленным
+INTEGER_OPERATIONS = {operator.add, operator.sub, operator.mul, operator.floordiv, operator.mod}
+
+def pack_numbers(make_values, is_float=False):
+    """Упаковывает числа в array.array: 'd' для дробных, 'q' для целых.
+
+    Целые, не помещающиеся в 64 бита, остаются списком int без потери точности.
+    make_values возвращает новый итератор значений: после переполнения
+    значения перебираются заново.
+    """
+    if is_float:
+        return array('d', make_values())
+    try:
+        return array('q', make_values())
+    except OverflowError:
+        return list(make_values())
+
+def is_float_data(data):
+    return getattr(data, 'typecode', None) == 'd'
+
+class Vector:
+    """Массив в выражениях: поэлементная арифметика над компактным array.array
+    (или списком int, если значения не помещаются в 64 бита).
+
+    Операции выполняются через map с функциями из operator, поэтому цикл по
+    элементам идёт внутри интерпретатора, без промежуточных списков.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def _apply(self, other, op, reverse=False):
+        if isinstance(other, Vector):
+            if len(other.data) != len(self.data):
+                raise ValueError(f"Размеры массивов не совпадают: {len(self.data)} и {len(other.data)}")
+            is_float = is_float_data(other.data)
+            make_values = lambda: map(op, self.data, other.data)
+        elif isinstance(other, (int, float)):
+            is_float = isinstance(other, float)
+            if reverse:
+                make_values = lambda: map(op, repeat(other), self.data)
+            else:
+                make_values = lambda: map(op, self.data, repeat(other))
+        else:
+            return NotImplemented
+        is_float = is_float or is_float_data(self.data) or op not in INTEGER_OPERATIONS
+        return Vector(pack_numbers(make_values, is_float))
+
+    def __add__(self, other):
+        return self._apply(other, operator.add)
+
+    def __sub__(self, other):
+        return self._apply(other, operator.sub)
+
+    def __mul__(self, other):
+        return self._apply(other, operator.mul)
+
+    def __truediv__(self, other):
+        return self._apply(other, operator.truediv)
+
+    def __floordiv__(self, other):
+        return self._apply(other, operator.floordiv)
+
+    def __mod__(self, other):
+        return self._apply(other, operator.mod)
+
+    def __pow__(self, other):
+        return self._apply(other, operator.pow)
+
+    def __radd__(self, other):
+        return self._apply(other, operator.add)
+
+    def __rmul__(self, other):
+        return self._apply(other, operator.mul)
+
+    def __rsub__(self, other):
+        return self._apply(other, operator.sub, reverse=True)
+
+    def __rtruediv__(self, other):
+        return self._apply(other, operator.truediv, reverse=True)
+
+    def __rfloordiv__(self, other):
+        return self._apply(other, operator.floordiv, reverse=True)
+
+    def __rmod__(self, other):
+        return self._apply(other, operator.mod, reverse=True)
+
+    def __rpow__(self, other):
+        return self._apply(other, operator.pow, reverse=True)
+
+    def __neg__(self):
+        return Vector(pack_numbers(lambda: map(operator.neg, self.data), is_float_data(self.data)))
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Vector(pack_numbers(lambda: map(abs, self.data), is_float_data(self.data)))
+
+    def __len__(self):
+        return len(self.data)
+
+def _reduction(name, func):
+    """Функция свёртки: принимает один массив или несколько чисел."""
+    def reduce(*args):
+        if len(args) == 1 and isinstance(args[0], Vector):
+            values = args[0].data
+        else:
+            values = args
+        if not values:
+            raise ValueError(f"Функция {name} требует хотя бы одно значение")
+        return func(values)
+    return reduce
+
+VARIABLE_PATTERN = re.compile(r'var\s+(\w+)\s*=\s*(.+)')
+EXPRESSION_PATTERN = re.compile(r'\.?\[\s*(?:(\w+)\s*:)?\s*(.+?)\s*\]\s*(?:!.*)?$')
+IDENTIFIER_PATTERN = re.compile(r'\b[A-Za-z_]\w*\b')
+
+def iter_statements(lines, start=0):
+    """Перебирает объявления и выражения, пропуская пустые строки и комментарии.
+
+    Возвращает пары (номер строки, строка).
+    """
+    in_multiline_comment = False
+    for index in range(start, len(lines)):
+        line = lines[index].strip()
+
+        # Пропускаем пустые строки
+        if not line:
+            continue
+
+        # Обработка начала многострочного комментария
+        if line == '=begin':
+            in_multiline_comment = True
+            continue
+
+        # Обработка конца многострочного комментария
+        if line == '=end':
+            in_multiline_comment = False
+            continue
+
+        # Пропускаем строки внутри многострочного комментария
+        if in_multiline_comment:
+            continue
+
+        # Пропускаем однострочные комментарии
+        if line.startswith('!'):
+            continue
+
+        if line.startswith('var') or line.startswith('[') or line.startswith('.['):
+            yield index, line
+        # Если строка не подходит ни под один формат, она пропускается
+
+    if in_multiline_comment:
+        raise SyntaxError("Незакрытый многострочный комментарий")
+
+def unnamed_expression_name(taken, explicit=()):
+    """Имя безымянного выражения: expression_N, где N - его номер по порядку в файле.
+
+    Если такое имя уже занято или явно дано выражению где-либо в файле
+    (explicit), берётся следующий свободный номер: явное имя имеет приоритет.
+    """
+    index = len(taken) + 1
+    while f"expression_{index}" in taken or f"expression_{index}" in explicit:
+        index += 1
+    return f"expression_{index}"
+
+def explicit_expression_names(lines):
+    """Имена, явно данные выражениям файла."""
+    names = set()
+    for _, line in iter_statements(lines):
+        if not line.startswith('var'):
+            match = EXPRESSION_PATTERN.match(line)
+            if match and match.group(1) is not None:
+                names.add(match.group(1))
+    return names
+
+def expression_names(expr):
+    """Имена переменных, от которых зависит выражение."""
+    return set(IDENTIFIER_PATTERN.findall(expr)) - ConfigParser.FUNCTIONS.keys()
 
 class ConfigParser:
+    # Функции, доступные в выражениях; их имена не считаются зависимостями
+    FUNCTIONS = {
+        'max': _reduction('max', max),
+        'min': _reduction('min', min),
+        'sum': _reduction('sum', sum),
+        'mean': _reduction('mean', lambda values: sum(values) / len(values)),
+    }
+
     def __init__(self):
         self.variables = {}
         self.current_line = 0
         self.lines = []
+        # Исходный текст выражений и их результаты (имя -> значение)
+        self.expressions = {}
+        self.results = {}
+        # Граф зависимостей: выражение -> переменные и переменная -> выражения
+        self.dependencies = {}
+        self.dependents = {}
+        # Явные имена выражений файла: безымянные выражения их не занимают
+        self.explicit_names = set()
 
     def parse_file(self, filename):
         try:
@@ -19,66 +241,74 @@ class ConfigParser:
             sys.exit(1)
 
     def parse(self):
-        result = {}
-        in_multiline_comment = False
-        
-        while self.current_line < len(self.lines):
-            line = self.lines[self.current_line].strip()
-            
-            # Пропускаем пустые строки
-            if not line:
-                self.current_line += 1
-                continue
-            
-            # Обработка начала многострочного комментария
-            if line == '=begin':
-                in_multiline_comment = True
-                self.current_line += 1
-                continue
-            
-            # Обработка конца многострочного комментария
-            if line == '=end':
-                in_multiline_comment = False
-                self.current_line += 1
-                continue
-            
-            # Пропускаем строки внутри многострочного комментария
-            if in_multiline_comment:
-                self.current_line += 1
-                continue
-            
-            # Пропускаем однострочные комментарии
-            if line.startswith('!'):
-                self.current_line += 1
-                continue
-            
+        self.explicit_names = explicit_expression_names(self.lines)
+        for self.current_line, line in iter_statements(self.lines, self.current_line):
             # Обработка объявления переменных
             if line.startswith('var'):
                 self.parse_variable(line)
-                self.current_line += 1
-                continue
-            
             # Обработка выражений
-            if line.startswith('[') or line.startswith('.['):
-                expr = line.strip('.[').strip(']').strip()
-                try:
-                    value = self.evaluate_expression(expr)
-                    result['expression_result'] = float(value)
-                except Exception:
-                    pass
-                self.current_line += 1
-                continue
+            else:
+                self.parse_expression(line)
+        self.current_line = len(self.lines)
             
-            # Если строка не подходит ни под один формат
-            self.current_line += 1
+        return dict(self.results)
 
-        if in_multiline_comment:
-            raise SyntaxError("Незакрытый многострочный комментарий")
-            
-        return result
+    def parse_expression(self, line):
+        match = EXPRESSION_PATTERN.match(line)
+        if not match:
+            raise SyntaxError(f"Некорректное выражение в строке {self.current_line + 1}")
+
+        name, expr = match.groups()
+        if name is None:
+            name = unnamed_expression_name(self.expressions, self.explicit_names)
+        elif name in self.expressions:
+            raise SyntaxError(f"Повторное имя выражения '{name}' в строке {self.current_line + 1}")
+
+        try:
+            self.add_expression(name, expr)
+        except Exception as e:
+            raise SyntaxError(f"Ошибка в строке {self.current_line + 1}: {str(e)}")
+
+    def add_expression(self, name, expr):
+        """Регистрирует выражение в графе зависимостей и вычисляет его."""
+        for variable in self.dependencies.get(name, ()):
+            self.dependents[variable].discard(name)
+
+        depends_on = expression_names(expr)
+        self.expressions[name] = expr
+        self.dependencies[name] = depends_on
+        for variable in depends_on:
+            self.dependents.setdefault(variable, set()).add(name)
+
+        self.results[name] = self.evaluate_result(expr)
+
+    def remove_expression(self, name):
+        """Удаляет выражение, его результат и рёбра графа зависимостей."""
+        for variable in self.dependencies.pop(name, ()):
+            self.dependents[variable].discard(name)
+        self.expressions.pop(name, None)
+        self.results.pop(name, None)
+
+    def evaluate_result(self, expr):
+        """Вычисляет выражение; результат - число или массив array.array."""
+        value = self.evaluate_expression(expr)
+        if isinstance(value, Vector):
+            return value.data
+        return float(value)
+
+    def set_variable(self, name, value):
+        """Изменяет переменную и пересчитывает только зависящие от неё выражения.
+
+        Возвращает множество имён пересчитанных выражений.
+        """
+        self.variables[name] = value
+        affected = self.dependents.get(name, set())
+        for expr_name in affected:
+            self.results[expr_name] = self.evaluate_result(self.expressions[expr_name])
+        return set(affected)
 
     def parse_variable(self, line):
-        match = re.match(r'var\s+(\w+)\s*=\s*(.+)', line)
+        match = VARIABLE_PATTERN.match(line)
         if not match:
             raise SyntaxError(f"Некорректное объявление переменной в строке {self.current_line + 1}")
         
@@ -103,77 +333,484 @@ class ConfigParser:
             raise SyntaxError(f"Ошибка в строке {self.current_line + 1}: {str(e)}")
 
     def parse_array(self, array_str):
-        content = array_str[1:-1].strip()
-        if not content:
-            return []
-        
-        elements = []
-        for item in content.split(','):
-            item = item.strip()
-            if not item:
-                continue
-            
-            try:
-                # Пробуем сначала как целое число, потом как float
+        items = [item for item in array_str[1:-1].split(',') if item.strip()]
+
+        # Массив хранится компактно: 'q' для целых чисел, 'd' если есть дробные
+        try:
+            return pack_numbers(lambda: map(int, items))
+        except ValueError:
+            pass
+        try:
+            return array('d', map(float, items))
+        except ValueError:
+            for item in items:
                 try:
-                    elements.append(int(item))
+                    float(item)
                 except ValueError:
-                    elements.append(float(item))
-            except ValueError:
-                raise SyntaxError(f"Некорректное значение '{item}' в массиве")
-                
-        return elements
+                    raise SyntaxError(f"Некорректное значение '{item.strip()}' в массиве")
+            raise
 
     def evaluate_expression(self, expr):
-        # Проверяем, является ли это вызовом max
-        if expr.startswith('max(') and expr.endswith(')'):
-            args_str = expr[4:-1].strip()
-            if args_str in self.variables:
-                # Если аргумент - это имя переменной
-                value = self.variables[args_str]
-                if isinstance(value, list):
-                    return float(max(value))
-            else:
-                # Если аргументы переданы напрямую
-                try:
-                    args = [float(x.strip()) for x in args_str.split(',')]
-                    return max(args)
-                except ValueError:
-                    raise ValueError(f"Некорректные аргументы для функции max: {args_str}")
-        
-        # Если это не max, обрабатываем как обычное выражение
+        # Переменные передаются в eval как пространство имён, массивы - как Vector
+        namespace = dict(self.FUNCTIONS)
         for name, value in self.variables.items():
-            if isinstance(value, (int, float)):
-                expr = re.sub(r'\b' + name + r'\b', str(value), expr)
+            namespace[name] = Vector(value) if isinstance(value, (array, list)) else value
         
         try:
-            safe_dict = {'__builtins__': None}
-            return eval(expr, {"__builtins__": None}, safe_dict)
+            return eval(expr, {"__builtins__": None}, namespace)
         except Exception as e:
             raise ValueError(f"Ошибка в выражении: {str(e)}")
 
+class TranslationCache:
+    """Постоянный кеш сериализованного TOML, ключ - хеш содержимого и версии транслятора.
+
+    Каждая запись хранится в отдельном файле; время последнего обращения (mtime)
+    используется для вытеснения давно не использованных записей.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_size=DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.toml")
+
+    def get(self, key):
+        text = io.StringIO()
+        if not self.copy_to(key, text):
+            return None
+        return text.getvalue()
+
+    def has(self, key):
+        return os.path.exists(self._path(key))
+
+    def copy_to(self, key, f):
+        """Копирует запись в открытый файл f. Возвращает False, если записи нет."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as cached:
+                shutil.copyfileobj(cached, f)
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put(self, key, text):
+        self.put_from(key, io.StringIO(text))
+
+    def put_from(self, key, f):
+        """Сохраняет в кеш содержимое открытого файла f начиная с текущей позиции."""
+        os.makedirs(self.directory, exist_ok=True)
+        # Запись через временный файл, чтобы параллельные процессы не видели частичных данных
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as cached:
+            shutil.copyfileobj(f, cached)
+        os.replace(tmp_path, self._path(key))
+
+    def evict(self):
+        """Удаляет давно не использованные записи, пока размер кеша больше max_size."""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        for name in names:
+            if not name.endswith('.toml'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+def translation_key(data):
+    """Ключ трансляции: хеш версии транслятора и содержимого входного файла."""
+    return hashlib.sha256(TRANSLATOR_VERSION.encode() + b'\0' + data).hexdigest()
+
+def _toml_string(value):
+    return '"' + ILLEGAL_STRING_CHARS.sub(
+        lambda m: STRING_ESCAPES.get(m.group(), f"\\u{ord(m.group()):04x}"), value) + '"'
+
+def _toml_key(name):
+    return name if BARE_KEY.fullmatch(name) else _toml_string(name)
+
+def _toml_scalar(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, str):
+        return _toml_string(value)
+    raise TypeError(f"Значение типа {type(value).__name__} нельзя записать в TOML")
+
+def write_toml_array(f, values):
+    """Записывает массив порциями по ARRAY_CHUNK_SIZE элементов."""
+    if not len(values):
+        f.write('[]')
+        return
+    # Элементы array.array - только числа, их достаточно привести к строке
+    formatter = str if isinstance(values, array) else _toml_scalar
+    f.write('[\n')
+    for start in range(0, len(values), ARRAY_CHUNK_SIZE):
+        chunk = values[start:start + ARRAY_CHUNK_SIZE]
+        f.write('    ' + ',\n    '.join(map(formatter, chunk)) + ',\n')
+    f.write(']')
+
+def write_toml_entry(f, key, value):
+    f.write(f"{_toml_key(key)} = ")
+    if isinstance(value, (array, list)):
+        write_toml_array(f, value)
+    else:
+        f.write(_toml_scalar(value))
+    f.write('\n')
+
+def write_toml_table(f, name, values):
+    """Записывает таблицу TOML значение за значением, не собирая её в строку."""
+    f.write(f"[{name}]\n")
+    for key, value in values.items():
+        write_toml_entry(f, key, value)
+
+def parse_source(data):
+    """Разбирает содержимое конфигурационного файла, возвращает ConfigParser."""
+    config_parser = ConfigParser()
+    config_parser.lines = [line.strip() for line in data.decode('utf-8').splitlines()]
+    config_parser.parse()
+    return config_parser
+
+def write_translation(f, config_parser):
+    """Записывает секции [variables] и [expressions] в открытый файл f."""
+    write_toml_table(f, 'variables', config_parser.variables)
+    f.write('\n')
+    write_toml_table(f, 'expressions', config_parser.results)
+
+def translate_source(data):
+    """Транслирует содержимое конфигурационного файла в текст TOML."""
+    text = io.StringIO()
+    write_translation(text, parse_source(data))
+    return text.getvalue()
+
+def default_output_path(input_path):
+    base_name = os.path.splitext(input_path)[0]
+    return f"{base_name}_config.toml"
+
+def collect_inputs(patterns):
+    """Раскрывает файлы, glob-шаблоны и директории в список входных файлов."""
+    inputs = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            inputs.extend(sorted(glob.glob(os.path.join(pattern, '*.txt'))))
+        elif glob.has_magic(pattern):
+            inputs.extend(sorted(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p)))
+        else:
+            inputs.append(pattern)
+    # Убираем повторы, сохраняя порядок
+    return list(dict.fromkeys(inputs))
+
+def read_source_hash(output_path):
+    """Возвращает ключ трансляции, записанный в выходной файл, или None."""
+    try:
+        with open(output_path, 'r', encoding='utf-8') as f:
+            first_line = f.readline().rstrip('\n')
+    except OSError:
+        return None
+    if first_line.startswith(HASH_HEADER):
+        return first_line[len(HASH_HEADER):]
+    return None
+
+def translate_file(input_path, output_path=None, cache=None):
+    """Транслирует один файл. Возвращает 'translated', 'cached' или 'skipped'."""
+    if output_path is None:
+        output_path = default_output_path(input_path)
+
+    with open(input_path, 'rb') as f:
+        data = f.read()
+    digest = translation_key(data)
+    if read_source_hash(output_path) == digest:
+        return 'skipped'
+
+    # Разбор выполняется до открытия выходного файла, чтобы ошибка не оставила его частично записанным
+    config_parser = None
+    if cache is None or not cache.has(digest):
+        config_parser = parse_source(data)
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w+', encoding='utf-8') as f:
+            f.write(f"{HASH_HEADER}{digest}\n")
+            body_start = f.tell()
+            if config_parser is None and cache.copy_to(digest, f):
+                status = 'cached'
+            else:
+                status = 'translated'
+                if config_parser is None:
+                    config_parser = parse_source(data)
+                write_translation(f, config_parser)
+                if cache is not None:
+                    f.seek(body_start)
+                    cache.put_from(digest, f)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return status
+
+def _translate_job(job):
+    input_path, output_path, cache = job
+    try:
+        return input_path, translate_file(input_path, output_path, cache), None
+    except Exception as e:
+        return input_path, 'failed', f"{type(e).__name__}: {e}"
+
+def translate_files(jobs, workers=None):
+    """Транслирует список задач (вход, выход, кеш), при workers > 1 - в пуле процессов."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        return [_translate_job(job) for job in jobs]
+    # Крупные порции снижают накладные расходы на передачу задач между процессами
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_translate_job, jobs, chunksize=chunksize))
+
+class IncrementalTranslation:
+    """Трансляция одного файла в режиме --watch.
+
+    Между обновлениями хранится состояние ConfigParser и уже отформатированные
+    строки TOML. При изменении файла заново разбираются только изменившиеся
+    объявления и выражения, пересчитываются зависящие от них выражения, и
+    форматируются только их значения. Если изменение нельзя применить
+    точечно (переменная удалена или объявлена дважды, выражение ссылается на
+    переменную, объявленную ниже), файл разбирается целиком.
+    """
+
+    def __init__(self, input_path, output_path=None):
+        self.input_path = input_path
+        self.output_path = output_path or default_output_path(input_path)
+        self.parser = None
+        self.mtime = None
+        # Объявления из последней успешной трансляции: имя -> (номер строки, текст)
+        self.variable_lines = {}
+        self.expression_lines = {}
+        # Совпадают ли сохранённые объявления с состоянием parser: после полного
+        # разбора файла с повторными объявлениями _scan запоминает первое
+        # объявление, а parser - последнее, и точечное обновление невозможно
+        self.synced = False
+        # Отформатированные строки TOML: (секция, имя) -> строка
+        self.fragments = {}
+        self.order = ([], [])
+
+    def poll(self):
+        """Транслирует файл, если он изменился. Возвращает изменённые ключи или None."""
+        try:
+            mtime = os.stat(self.input_path).st_mtime_ns
+        except OSError:
+            return None
+        if mtime == self.mtime:
+            return None
+        self.mtime = mtime
+        return self.update()
+
+    def update(self):
+        with open(self.input_path, 'rb') as f:
+            data = f.read()
+        lines = [line.strip() for line in data.decode('utf-8').splitlines()]
+        variable_lines, expression_lines, incremental = self._scan(lines)
+
+        changed = None
+        if incremental and self.synced:
+            try:
+                changed = self._apply(lines, variable_lines, expression_lines)
+            except Exception:
+                changed = None
+        if changed is None:
+            changed = self._reparse(lines)
+        else:
+            self.order = (list(variable_lines), list(expression_lines))
+
+        self.variable_lines = variable_lines
+        self.expression_lines = expression_lines
+        self.synced = incremental
+        self._write(data)
+        return changed
+
+    def _scan(self, lines):
+        """Находит объявления и выражения и проверяет, можно ли обновить их точечно."""
+        variable_lines = {}
+        expression_lines = {}
+        # Имена безымянным выражениям даются после прохода, когда известны все явные имена
+        expressions = []
+        incremental = True
+        for index, line in iter_statements(lines):
+            if line.startswith('var'):
+                match = VARIABLE_PATTERN.match(line)
+                if not match or match.group(1) in variable_lines:
+                    incremental = False
+                    continue
+                variable_lines[match.group(1)] = (index, line)
+            else:
+                match = EXPRESSION_PATTERN.match(line)
+                if not match:
+                    incremental = False
+                    continue
+                name, expr = match.groups()
+                expressions.append((name, index, expr))
+                # Выражение вычисляется со значениями, объявленными выше него
+                for variable in expression_names(expr):
+                    if variable not in variable_lines:
+                        incremental = False
+
+        explicit = {name for name, _, _ in expressions if name is not None}
+        for name, index, expr in expressions:
+            if name is None:
+                name = unnamed_expression_name(expression_lines, explicit)
+            if name in expression_lines:
+                incremental = False
+                continue
+            expression_lines[name] = (index, expr)
+        return variable_lines, expression_lines, incremental
+
+    def _apply(self, lines, variable_lines, expression_lines):
+        if self.variable_lines.keys() - variable_lines.keys():
+            return None
+
+        parser = self.parser
+        parser.lines = lines
+        changed = set()
+        for name, (index, line) in variable_lines.items():
+            old = self.variable_lines.get(name)
+            if old is not None and old[1] == line:
+                continue
+            parser.current_line = index
+            parser.parse_variable(line)
+            changed.add(('variables', name))
+            recomputed = parser.set_variable(name, parser.variables[name])
+            changed.update(('expressions', expr_name) for expr_name in recomputed)
+
+        for name in self.expression_lines.keys() - expression_lines.keys():
+            parser.remove_expression(name)
+            self.fragments.pop(('expressions', name), None)
+            changed.discard(('expressions', name))
+
+        for name, (index, expr) in expression_lines.items():
+            old = self.expression_lines.get(name)
+            if old is not None and old[1] == expr:
+                continue
+            parser.current_line = index
+            parser.add_expression(name, expr)
+            changed.add(('expressions', name))
+
+        for key in changed:
+            self._render(key)
+        return changed
+
+    def _reparse(self, lines):
+        self.parser = None
+        parser = ConfigParser()
+        parser.lines = lines
+        parser.parse()
+        self.parser = parser
+        self.order = (list(parser.variables), list(parser.results))
+
+        self.fragments = {}
+        changed = {('variables', name) for name in parser.variables}
+        changed.update(('expressions', name) for name in parser.results)
+        for key in changed:
+            self._render(key)
+        return changed
+
+    def _render(self, key):
+        section, name = key
+        values = self.parser.variables if section == 'variables' else self.parser.results
+        text = io.StringIO()
+        write_toml_entry(text, name, values[name])
+        self.fragments[key] = text.getvalue()
+
+    def _write(self, data):
+        variables, expressions = self.order
+        tmp_path = f"{self.output_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f"{HASH_HEADER}{translation_key(data)}\n")
+            f.write("[variables]\n")
+            f.writelines(self.fragments[('variables', name)] for name in variables)
+            f.write("\n[expressions]\n")
+            f.writelines(self.fragments[('expressions', name)] for name in expressions)
+        os.replace(tmp_path, self.output_path)
+
+def watch(inputs, output_path=None, interval=0.5):
+    """Следит за входными файлами и транслирует их заново при изменении."""
+    translations = [IncrementalTranslation(path, output_path) for path in inputs]
+    try:
+        while True:
+            for translation in translations:
+                try:
+                    changed = translation.poll()
+                except Exception as e:
+                    print(f"{translation.input_path}: {type(e).__name__}: {e}", file=sys.stderr)
+                    continue
+                if changed is not None:
+                    print(f"{translation.input_path}: обновлено значений: {len(changed)}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
 def main():
     parser = argparse.ArgumentParser(description='Конвертер конфигурационных файлов')
-    parser.add_argument('--input', required=True, help='Входной конфигурационный файл')
+    parser.add_argument('--input', required=True, nargs='+',
+                        help='Входные конфигурационные файлы, glob-шаблоны или директории')
     parser.add_argument('--output', help='Выходной TOML файл (по умолчанию: input_config.toml)', default=None)
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='Количество параллельных процессов (по умолчанию: число ядер)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'Директория кеша трансляций (по умолчанию: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+                        help='Максимальный размер кеша в мегабайтах')
+    parser.add_argument('--no-cache', action='store_true', help='Не использовать кеш трансляций')
+    parser.add_argument('--watch', action='store_true',
+                        help='Следить за входными файлами и транслировать изменения')
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help='Интервал проверки файлов в режиме --watch, в секундах')
     args = parser.parse_args()
 
-    config_parser = ConfigParser()
-    result = config_parser.parse_file(args.input)
-    
-    output = {
-        "variables": config_parser.variables,
-        "expressions": result
-    }
-    
-    if args.output:
-        output_file = args.output
-    else:
-        base_name = os.path.splitext(args.input)[0]
-        output_file = f"{base_name}_config.toml"
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(tomli_w.dumps(output))
+    inputs = collect_inputs(args.input)
+    if not inputs:
+        parser.error('не найдено ни одного входного файла')
+    if args.output and len(inputs) > 1:
+        parser.error('--output можно указать только для одного входного файла')
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs должен быть положительным числом')
+
+    if args.watch:
+        watch(inputs, args.output, args.interval)
+        return
+
+    cache = None if args.no_cache else TranslationCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    jobs = [(path, args.output, cache) for path in inputs]
+    failed = 0
+    for input_path, status, error in translate_files(jobs, args.jobs):
+        if error:
+            failed += 1
+            print(f"{input_path}: {error}", file=sys.stderr)
+        elif len(jobs) > 1:
+            print(f"{input_path}: {status}")
+
+    if cache is not None:
+        cache.evict()
+
+    if failed:
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
@@ -1,6 +1,7 @@
 import pytest
 import os
-from config_translator import ConfigParser
+import tomli_w
+from config_translator import ConfigParser, IncrementalTranslation, TranslationCache, collect_inputs, translate_file, translate_files, translate_source
 
 def test_comments():
     config = """
@@ -29,7 +30,28 @@ def test_arrays():
     result = parser.parse_file('test_config.txt')
     os.remove('test_config.txt')
     assert 'arr' in parser.variables
-    assert parser.variables['arr'] == [1.0, 2.0, 3.0, 4.0]
+    assert parser.variables['arr'].tolist() == [1.0, 2.0, 3.0, 4.0]
+
+def test_arrays_beyond_64_bits():
+    source = '\n'.join([
+        'var big = { 99999999999999999999, 1 };',
+        'var a = { 3000000000 };',
+        '[cube: a * a * a]',
+        '[neg: -big]',
+        '[small: a - 1]',
+    ]).encode('utf-8')
+    config_parser = ConfigParser()
+    config_parser.lines = source.decode('utf-8').splitlines()
+    config_parser.parse()
+    assert list(config_parser.variables['big']) == [99999999999999999999, 1]
+    assert list(config_parser.results['cube']) == [27000000000000000000000000000]
+    assert list(config_parser.results['neg']) == [-99999999999999999999, -1]
+    assert config_parser.results['small'].typecode == 'q'
+    assert translate_source(source) == tomli_w.dumps({
+        'variables': {'big': [99999999999999999999, 1], 'a': [3000000000]},
+        'expressions': {'cube': [27000000000000000000000000000], 'neg': [-99999999999999999999, -1],
+                        'small': [2999999999]},
+    })
 
 def test_expressions():
     config = """
@@ -42,7 +64,7 @@ def test_expressions():
         f.write(config)
     result = parser.parse_file('test_config.txt')
     os.remove('test_config.txt')
-    assert result['expression_result'] == 30.0
+    assert result['expression_1'] == 30.0
 
 def test_max_function():
     config = """
@@ -54,7 +76,7 @@ def test_max_function():
         f.write(config)
     result = parser.parse_file('test_config.txt')
     os.remove('test_config.txt')
-    assert result['expression_result'] == 3.0
+    assert result['expression_1'] == 3.0
 
 def test_syntax_error():
     config = """
@@ -89,4 +111,199 @@ def test_constant_expression():
         f.write(config)
     result = parser.parse_file('test_config.txt')
     os.remove('test_config.txt')
-    assert result['expression_result'] == 6.0
+    assert result['expression_1'] == 6.0
+
+def test_all_expressions_kept():
+    config = """
+    var x = 2;
+    [x + 1]
+    [total: x * 10]
+    [min(x, 5)]
+    """
+    parser = ConfigParser()
+    with open('test_config.txt', 'w') as f:
+        f.write(config)
+    result = parser.parse_file('test_config.txt')
+    os.remove('test_config.txt')
+    assert result == {'expression_1': 3.0, 'total': 20.0, 'expression_3': 2.0}
+
+def test_expression_error():
+    config = """
+    var x = 1;
+    [x +]
+    """
+    parser = ConfigParser()
+    with open('test_config.txt', 'w') as f:
+        f.write(config)
+    with pytest.raises(SyntaxError):
+        parser.parse_file('test_config.txt')
+    os.remove('test_config.txt')
+
+def test_incremental_update():
+    config = """
+    var x = 1;
+    var y = 2;
+    [sum_x: x + 1]
+    [sum_y: y + 1]
+    """
+    parser = ConfigParser()
+    with open('test_config.txt', 'w') as f:
+        f.write(config)
+    parser.parse_file('test_config.txt')
+    os.remove('test_config.txt')
+    assert parser.set_variable('x', 10) == {'sum_x'}
+    assert parser.results == {'sum_x': 11.0, 'sum_y': 3.0}
+
+def test_translate_skips_unchanged(tmp_path):
+    source = tmp_path / 'app.txt'
+    source.write_text('var x = 1;\n[x + 1]\n', encoding='utf-8')
+    assert translate_file(str(source)) == 'translated'
+    assert (tmp_path / 'app_config.toml').exists()
+    assert translate_file(str(source)) == 'skipped'
+    source.write_text('var x = 2;\n[x + 1]\n', encoding='utf-8')
+    assert translate_file(str(source)) == 'translated'
+
+def test_batch_translation_reports_errors(tmp_path):
+    (tmp_path / 'good.txt').write_text('var x = 1;\n', encoding='utf-8')
+    (tmp_path / 'bad.txt').write_text('var x = ;\n', encoding='utf-8')
+    inputs = collect_inputs([str(tmp_path)])
+    assert len(inputs) == 2
+    results = translate_files([(path, None, None) for path in inputs], workers=2)
+    statuses = {os.path.basename(path): status for path, status, _ in results}
+    assert statuses == {'bad.txt': 'failed', 'good.txt': 'translated'}
+
+def test_translation_cache(tmp_path):
+    cache = TranslationCache(str(tmp_path / 'cache'))
+    source = tmp_path / 'app.txt'
+    source.write_text('var x = 1;\n[x + 1]\n', encoding='utf-8')
+    output = tmp_path / 'out.toml'
+    assert translate_file(str(source), str(output), cache) == 'translated'
+    expected = output.read_text(encoding='utf-8')
+    output.unlink()
+    assert translate_file(str(source), str(output), cache) == 'cached'
+    assert output.read_text(encoding='utf-8') == expected
+
+def test_translation_cache_eviction(tmp_path):
+    cache = TranslationCache(str(tmp_path), max_size=10)
+    cache.put('old', 'x' * 8)
+    os.utime(tmp_path / 'old.toml', (0, 0))
+    cache.put('new', 'y' * 8)
+    assert cache.evict() == 1
+    assert cache.get('old') is None
+    assert cache.get('new') == 'y' * 8
+
+def test_array_expressions():
+    config = """
+    var arr = { 1, 5, 3 };
+    var weights = { 0.5, 1, 2 };
+    [total: sum(arr)]
+    [average: mean(arr)]
+    [smallest: min(arr * 2 - 1)]
+    [scaled: arr * weights]
+    [shifted: 10 - arr]
+    """
+    parser = ConfigParser()
+    with open('test_config.txt', 'w') as f:
+        f.write(config)
+    result = parser.parse_file('test_config.txt')
+    os.remove('test_config.txt')
+    assert parser.variables['arr'].typecode == 'q'
+    assert parser.variables['weights'].typecode == 'd'
+    assert result['total'] == 9.0
+    assert result['average'] == 3.0
+    assert result['smallest'] == 1.0
+    assert result['scaled'].tolist() == [0.5, 5.0, 6.0]
+    assert result['shifted'].tolist() == [9, 5, 7]
+
+def test_streaming_writer_matches_tomli_w():
+    source = '\n'.join([
+        'var big = { ' + ', '.join(str(i) for i in range(10000)) + ' };',
+        'var ratio = 0.25;',
+        'var title = "quote \\" and \\\\ slash";',
+        'var empty = { };',
+        '[total: sum(big) * ratio]',
+        '[scaled: big * ratio]',
+    ]).encode('utf-8')
+    config_parser = ConfigParser()
+    config_parser.lines = source.decode('utf-8').splitlines()
+    config_parser.parse()
+    expected = tomli_w.dumps({
+        'variables': {name: value.tolist() if hasattr(value, 'tolist') else value
+                      for name, value in config_parser.variables.items()},
+        'expressions': {name: value.tolist() if hasattr(value, 'tolist') else value
+                        for name, value in config_parser.results.items()},
+    })
+    assert translate_source(source) == expected
+
+def test_incremental_translation(tmp_path):
+    source = tmp_path / 'app.txt'
+    output = tmp_path / 'app_config.toml'
+    source.write_text('var x = 1;\nvar y = 2;\n[sum_x: x + 1]\n[sum_y: y + 1]\n', encoding='utf-8')
+    translation = IncrementalTranslation(str(source))
+    translation.update()
+
+    text = '=begin\nvar y = 100;\n=end\nvar x = 5;\nvar y = 2;\n[sum_x: x + 1]\n[sum_y: y + 1]\n[y * 2]\n'
+    source.write_text(text, encoding='utf-8')
+    changed = translation.update()
+    assert changed == {('variables', 'x'), ('expressions', 'sum_x'), ('expressions', 'expression_3')}
+    body = output.read_text(encoding='utf-8').split('\n', 1)[1]
+    assert body == translate_source(text.encode('utf-8'))
+
+def test_incremental_translation_falls_back_to_full_parse(tmp_path):
+    source = tmp_path / 'app.txt'
+    source.write_text('var x = 1;\n[x + 1]\n', encoding='utf-8')
+    translation = IncrementalTranslation(str(source))
+    translation.update()
+    source.write_text('[x + 1]\nvar x = 1;\n', encoding='utf-8')
+    with pytest.raises(SyntaxError):
+        translation.update()
+
+def test_expression_names_do_not_collide():
+    parser = ConfigParser()
+    parser.lines = ['[expression_2: 1]', '[2 + 2]', '[3 + 3]']
+    assert parser.parse() == {'expression_2': 1.0, 'expression_3': 4.0, 'expression_4': 6.0}
+
+def test_explicit_name_declared_after_unnamed_expression(tmp_path):
+    parser = ConfigParser()
+    parser.lines = ['var a = 1;', '[a + 1]', '[expression_1: a * 2]']
+    assert parser.parse() == {'expression_2': 2.0, 'expression_1': 2.0}
+
+    source = tmp_path / 'app.txt'
+    output = tmp_path / 'app_config.toml'
+    source.write_text('var a = 1;\n[a + 1]\n', encoding='utf-8')
+    translation = IncrementalTranslation(str(source))
+    translation.update()
+    text = 'var a = 1;\n[a + 1]\n[expression_1: a * 2]\n'
+    source.write_text(text, encoding='utf-8')
+    translation.update()
+    body = output.read_text(encoding='utf-8').split('\n', 1)[1]
+    assert body == translate_source(text.encode('utf-8'))
+
+def test_duplicate_expression_name():
+    parser = ConfigParser()
+    parser.lines = ['[a: 1]', '[a: 2]']
+    with pytest.raises(SyntaxError, match="Повторное имя выражения 'a' в строке 2"):
+        parser.parse()
+
+def test_incremental_translation_after_duplicate_declaration(tmp_path):
+    source = tmp_path / 'app.txt'
+    output = tmp_path / 'app_config.toml'
+    source.write_text('var z = {1,2,3};\nvar z = 2.5;\n', encoding='utf-8')
+    translation = IncrementalTranslation(str(source))
+    translation.update()
+
+    text = 'var z = {1,2,3};\n'
+    source.write_text(text, encoding='utf-8')
+    translation.update()
+    body = output.read_text(encoding='utf-8').split('\n', 1)[1]
+    assert body == translate_source(text.encode('utf-8'))
+
+def test_benchmark_corpus_parses():
+    from benchmark_config_translator import generate_config
+    source = generate_config(variables=50, arrays=2, array_length=100, expressions=30,
+                             nesting=5, comment_blocks=3, comment_lines=4)
+    parser = ConfigParser()
+    parser.lines = [line.strip() for line in source.splitlines()]
+    result = parser.parse()
+    assert len(parser.variables) == 52
+    assert len(result) == 30
@@ -1,97 +1,393 @@
+import ast
+import csv
+import os
 import re
 import yaml
-from typing import List, Tuple
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 from instruction import Instruction, InstructionType, encode_instruction
 
+# Команды ассемблера: тип инструкции, минимальное и максимальное число операндов
+COMMANDS = {
+    'LOAD': (InstructionType.LOAD_CONST, 2, 2),     # LOAD addr, const
+    'READ': (InstructionType.READ_MEMORY, 2, 3),    # READ dest, src[, offset]
+    'WRITE': (InstructionType.WRITE_MEMORY, 2, 2),  # WRITE src, dest
+    'BITREV': (InstructionType.BITREVERSE, 2, 2),   # BITREV dest, src
+}
+
+# Максимальная глубина вложенности макросов и .include
+MAX_NESTING = 64
+
+class SourceLine(NamedTuple):
+    """Разобранная строка исходного файла."""
+    line_num: int
+    label: Optional[str]
+    command: Optional[str]
+    operands: List[str]
+    text: str  # строка без комментария, нужна для .macro
+
+class Statement(NamedTuple):
+    """Инструкция исходника: место в файле и неразрешённые операнды."""
+    path: str
+    line_num: int
+    command: str
+    operands: List[str]
+
+# Лог в YAML пишется порциями по столько инструкций
+LOG_CHUNK_SIZE = 1024
+
+# Сколько байт подключаемых файлов одной сборки хранится разобранными;
+# файлы сверх этого объёма читаются с диска заново при каждом подключении
+PARSE_CACHE_BYTES = 1 << 20
+
+# C-реализация дампера PyYAML (libyaml) в разы быстрее, чем на чистом Python
+YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+def split_line(line: str) -> Tuple[Optional[str], Optional[str], List[str], str]:
+    """Разбирает строку на метку, команду, операнды и текст без комментария."""
+    line = line.strip()
+    if not line or line.startswith(';'):
+        return None, None, [], ''
+
+    # Удаляем комментарии
+    line = line.split(';')[0].strip()
+
+    # Разбираем метки
+    label = None
+    if ':' in line:
+        label, rest = line.split(':', 1)
+        label = label.strip()
+        line = rest.strip()
+        if not line:
+            return label, None, [], ''
+
+    # Разбираем команду и операнды
+    parts = re.split(r'\s+', line)
+    command = parts[0].upper()
+    operands = [op.strip() for op in ' '.join(parts[1:]).split(',') if op.strip()]
+
+    return label, command, operands, line
+
+def parse_source(path: str) -> List[SourceLine]:
+    """Читает и разбирает файл."""
+    return list(iter_source(path))
+
+def iter_source(path: str) -> Iterator[SourceLine]:
+    """Разбирает файл построчно, не держа в памяти весь файл."""
+    with open(path, 'r') as f:
+        for line_num, line in enumerate(f, 1):
+            yield SourceLine(line_num, *split_line(line))
+
 class Assembler:
     def __init__(self):
-        self.instructions = []
-        self.labels = {}
+        self.reset()
+
+    def reset(self) -> None:
+        """Очищает таблицу символов и инструкции перед новой сборкой."""
+        self.instruction_count = 0
+        self.labels: Dict[str, int] = {}
+        self.constants: Dict[str, str] = {}
+        self.macros: Dict[str, Tuple[List[str], List[SourceLine]]] = {}
+        # Разобранные файлы текущей сборки (не больше PARSE_CACHE_BYTES): файл,
+        # подключённый через .include несколько раз, разбирается один раз, а после
+        # сборки кеш освобождается
+        self.parse_cache: Dict[str, List[SourceLine]] = {}
+        self.parse_cache_bytes = 0
+        self.main_path = None
 
     def parse_line(self, line: str) -> Tuple[str, List[str]]:
         """Разбирает строку на команду и операнды."""
-        line = line.strip()
-        if not line or line.startswith(';'):
-            return None, []
-        
-        # Удаляем комментарии
-        line = line.split(';')[0].strip()
-        
-        # Разбираем метки
-        if ':' in line:
-            label, rest = line.split(':', 1)
-            self.labels[label.strip()] = len(self.instructions)
-            line = rest.strip()
-            if not line:
-                return None, []
-        
-        # Разбираем команду и операнды
-        parts = re.split(r'\s+', line)
-        command = parts[0].upper()
-        operands = [op.strip() for op in ' '.join(parts[1:]).split(',') if op.strip()]
-        
+        label, command, operands, _ = split_line(line)
+        if label is not None:
+            self.labels[label] = self.instruction_count
         return command, operands
 
-    def assemble(self, source_path: str, output_path: str, log_path: str) -> None:
-        """Собирает программу из исходного файла."""
-        with open(source_path, 'r') as f:
-            lines = f.readlines()
+    def _location(self, path: str, line_num: int) -> str:
+        if path == self.main_path:
+            return f"line {line_num}"
+        return f"{path}:{line_num}"
+
+    def first_pass(self, path: str) -> None:
+        """Первый проход: раскрывает .include и макросы, строит таблицу символов.
+
+        Сами инструкции не сохраняются, учитывается только их количество.
+        """
+        for _ in self.statements(path, define=True):
+            self.instruction_count += 1
+
+    def statements(self, path: str, define: bool = False,
+                   include_stack: Tuple[str, ...] = ()) -> Iterator[Statement]:
+        """Перебирает инструкции файла с раскрытыми .include и макросами.
 
-        log_data = []
-        binary_data = bytearray()
+        define=True - первый проход: определяются метки и константы .equ. Второй
+        проход заново читает исходники и использует готовую таблицу символов.
+        """
+        real_path = os.path.realpath(path)
+        if real_path in include_stack:
+            raise ValueError(f"Recursive .include of {path}")
+        if len(include_stack) >= MAX_NESTING:
+            raise ValueError(f"Too deeply nested .include of {path}")
+        # Кешируются только подключаемые файлы: основной файл читается один раз за проход
+        lines = self._source_lines(real_path) if include_stack else iter_source(real_path)
+        yield from self._process_lines(path, lines, include_stack + (real_path,), 0, define)
 
-        for line_num, line in enumerate(lines, 1):
-            command, operands = self.parse_line(line)
-            if not command:
-                continue
+    def _source_lines(self, real_path: str) -> Iterable[SourceLine]:
+        lines = self.parse_cache.get(real_path)
+        if lines is not None:
+            return lines
+        size = os.path.getsize(real_path)
+        if self.parse_cache_bytes + size > PARSE_CACHE_BYTES:
+            return iter_source(real_path)
+        self.parse_cache_bytes += size
+        lines = self.parse_cache[real_path] = parse_source(real_path)
+        return lines
 
+    def _process_lines(self, path: str, lines: Iterable[SourceLine], include_stack: Tuple[str, ...],
+                       depth: int, define: bool) -> Iterator[Statement]:
+        macro = None  # (имя, параметры, тело) определяемого макроса
+        line_num = 0
+        for source_line in lines:
+            line_num, label, command, operands, text = source_line
             try:
-                if command == 'LOAD':
-                    # LOAD addr, const
-                    addr = int(operands[0])
-                    const = int(operands[1])
-                    instr = Instruction(InstructionType.LOAD_CONST, [addr, const])
-                
-                elif command == 'READ':
-                    # READ dest, src, offset
-                    dest = int(operands[0])
-                    src = int(operands[1])
-                    offset = int(operands[2]) if len(operands) > 2 else 0
-                    instr = Instruction(InstructionType.READ_MEMORY, [dest, src, offset])
-                
-                elif command == 'WRITE':
-                    # WRITE src, dest
-                    src = int(operands[0])
-                    dest = int(operands[1])
-                    instr = Instruction(InstructionType.WRITE_MEMORY, [src, dest])
-                
-                elif command == 'BITREV':
-                    # BITREV dest, src
-                    dest = int(operands[0])
-                    src = int(operands[1])
-                    instr = Instruction(InstructionType.BITREVERSE, [dest, src])
-                
+                if macro is not None:
+                    if command == '.ENDM':
+                        self.macros[macro[0]] = (macro[1], macro[2])
+                        macro = None
+                    elif command == '.MACRO':
+                        raise ValueError("Nested .macro definitions are not supported")
+                    else:
+                        macro[2].append(source_line)
+                    continue
+
+                if label is not None and define:
+                    if label in self.labels or label in self.constants:
+                        raise ValueError(f"Duplicate symbol: {label}")
+                    self.labels[label] = self.instruction_count
+                if command is None:
+                    continue
+
+                if command == '.EQU':
+                    # .equ NAME, выражение
+                    if len(operands) != 2:
+                        raise ValueError(".equ expects a name and a value")
+                    name = operands[0]
+                    if define:
+                        if name in self.labels or name in self.constants:
+                            raise ValueError(f"Duplicate symbol: {name}")
+                        self.constants[name] = operands[1]
+
+                elif command == '.INCLUDE':
+                    # .include "file.asm" - путь относительно подключающего файла
+                    if len(operands) != 1:
+                        raise ValueError(".include expects a file name")
+                    include_path = os.path.join(os.path.dirname(path), operands[0].strip('"\''))
+                    yield from self.statements(include_path, define, include_stack)
+
+                elif command == '.MACRO':
+                    # .macro NAME param1, param2 ... .endm
+                    parts = text.split(None, 1)
+                    if len(parts) < 2:
+                        raise ValueError(".macro expects a name")
+                    header = re.split(r'[\s,]+', parts[1].strip())
+                    macro = (header[0].upper(), header[1:], [])
+
+                elif command in self.macros:
+                    yield from self._expand_macro(path, line_num, command, operands, include_stack, depth, define)
+
+                elif command in COMMANDS:
+                    yield Statement(path, line_num, command, operands)
+
                 else:
                     raise ValueError(f"Unknown command: {command}")
 
-                encoded = encode_instruction(instr)
-                binary_data.extend(encoded)
-                
-                # Логируем инструкцию
-                log_data.append({
-                    'line': line_num,
-                    'command': command,
-                    'operands': operands,
-                    'bytes': [f"0x{b:02X}" for b in encoded]
-                })
-
-            except Exception as e:
-                raise ValueError(f"Error at line {line_num}: {str(e)}")
-
-        # Записываем бинарный файл
-        with open(output_path, 'wb') as f:
-            f.write(binary_data)
-
-        # Записываем лог
-        with open(log_path, 'w') as f:
-            yaml.dump(log_data, f, sort_keys=False)
+            except ValueError as e:
+                if str(e).startswith('Error at'):
+                    raise
+                raise ValueError(f"Error at {self._location(path, line_num)}: {str(e)}")
+
+        if macro is not None:
+            raise ValueError(f"Error at {self._location(path, line_num)}: "
+                             f"Missing .endm for macro {macro[0]}")
+
+    def _expand_macro(self, path: str, line_num: int, name: str, args: List[str],
+                      include_stack: Tuple[str, ...], depth: int, define: bool) -> Iterator[Statement]:
+        params, body = self.macros[name]
+        if len(args) != len(params):
+            raise ValueError(f"Macro {name} expects {len(params)} arguments, got {len(args)}")
+        if depth >= MAX_NESTING:
+            raise ValueError(f"Too deeply nested macro {name}")
+
+        # Составные аргументы берутся в скобки, чтобы сохранить порядок вычисления
+        substitutions = {param: arg if re.fullmatch(r'\w+', arg) else f"({arg})"
+                         for param, arg in zip(params, args)}
+        pattern = re.compile(r'\b(' + '|'.join(map(re.escape, params)) + r')\b') if params else None
+
+        def substitute(operand: str) -> str:
+            if pattern is None:
+                return operand
+            return pattern.sub(lambda m: substitutions[m.group(1)], operand)
+
+        # Строки макроса получают номер строки вызова, чтобы ошибки указывали на него
+        expanded = [SourceLine(line_num, source_line.label, source_line.command,
+                               [substitute(op) for op in source_line.operands], source_line.text)
+                    for source_line in body]
+        yield from self._process_lines(path, expanded, include_stack, depth + 1, define)
+
+    def evaluate(self, expr: str, resolving: Tuple[str, ...] = ()) -> int:
+        """Вычисляет операнд: число, метку, константу .equ или выражение с ними."""
+        try:
+            return int(expr)
+        except ValueError:
+            pass
+        try:
+            node = ast.parse(expr.strip(), mode='eval').body
+        except SyntaxError:
+            raise ValueError(f"Invalid operand: {expr}")
+        return self._evaluate_node(node, expr, resolving)
+
+    def _evaluate_node(self, node: ast.AST, expr: str, resolving: Tuple[str, ...]) -> int:
+        if isinstance(node, ast.Constant) and type(node.value) is int:
+            return node.value
+        if isinstance(node, ast.Name):
+            name = node.id
+            if name in self.labels:
+                return self.labels[name]
+            if name in self.constants:
+                if name in resolving:
+                    raise ValueError(f"Circular definition of {name}")
+                return self.evaluate(self.constants[name], resolving + (name,))
+            raise ValueError(f"Unknown symbol: {name}")
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            value = self._evaluate_node(node.operand, expr, resolving)
+            return -value if isinstance(node.op, ast.USub) else value
+        if isinstance(node, ast.BinOp):
+            left = self._evaluate_node(node.left, expr, resolving)
+            right = self._evaluate_node(node.right, expr, resolving)
+            if isinstance(node.op, ast.Add):
+                return left + right
+            if isinstance(node.op, ast.Sub):
+                return left - right
+            if isinstance(node.op, ast.Mult):
+                return left * right
+            if isinstance(node.op, ast.FloorDiv):
+                return left // right
+            if isinstance(node.op, ast.LShift):
+                return left << right
+            if isinstance(node.op, ast.BitOr):
+                return left | right
+            if isinstance(node.op, ast.BitAnd):
+                return left & right
+        raise ValueError(f"Invalid operand: {expr}")
+
+    def encode(self, statement: Statement) -> Instruction:
+        """Второй проход для одной инструкции: разрешает символы в операндах."""
+        instruction_type, min_operands, max_operands = COMMANDS[statement.command]
+        operands = statement.operands
+        if not min_operands <= len(operands) <= max_operands:
+            raise ValueError(f"{statement.command} expects {min_operands} operands"
+                             if min_operands == max_operands else
+                             f"{statement.command} expects {min_operands}-{max_operands} operands")
+        values = [self.evaluate(op) for op in operands]
+        if instruction_type == InstructionType.READ_MEMORY and len(values) == 2:
+            values.append(0)  # смещение по умолчанию
+        return Instruction(instruction_type, values)
+
+    def assemble(self, source_path: str, output_path: str, log_path: str,
+                 log_format: str = 'yaml') -> None:
+        """Собирает программу из исходного файла.
+
+        Бинарный файл и лог пишутся потоково по мере кодирования инструкций:
+        первый проход сохраняет только таблицу символов, второй заново читает
+        исходники. log_format: 'yaml' (по умолчанию) или 'csv' - компактный листинг.
+        """
+        if log_format not in LOG_WRITERS:
+            raise ValueError(f"Unknown log format: {log_format}")
+        self.reset()
+        self.main_path = source_path
+        try:
+            self.first_pass(source_path)
+            # Второй проход раскрывает макросы заново в том же порядке определений
+            self.macros.clear()
+            self._write_output(source_path, output_path, log_path, log_format)
+        finally:
+            self.parse_cache.clear()
+            self.parse_cache_bytes = 0
+
+    def _write_output(self, source_path: str, output_path: str, log_path: str, log_format: str) -> None:
+        """Второй проход: кодирует инструкции и пишет бинарный файл и лог."""
+        # Файлы пишутся во временные и заменяют результат только после успешной сборки
+        output_tmp = f"{output_path}.{os.getpid()}.tmp"
+        log_tmp = f"{log_path}.{os.getpid()}.tmp"
+        try:
+            with open(output_tmp, 'wb') as binary_file, open(log_tmp, 'w', newline='') as log_file:
+                log_writer = LOG_WRITERS[log_format](log_file)
+                for statement in self.statements(source_path):
+                    try:
+                        encoded = encode_instruction(self.encode(statement))
+                    except Exception as e:
+                        raise ValueError(f"Error at {self._location(statement.path, statement.line_num)}: {str(e)}")
+                    binary_file.write(encoded)
+                    log_writer.write(statement, encoded, None if statement.path == source_path else statement.path)
+                log_writer.close()
+            os.replace(output_tmp, output_path)
+            os.replace(log_tmp, log_path)
+        finally:
+            for path in (output_tmp, log_tmp):
+                if os.path.exists(path):
+                    os.remove(path)
+
+class YamlLogWriter:
+    """Лог сборки в YAML, записываемый порциями по LOG_CHUNK_SIZE инструкций.
+
+    Каждая порция - блочный список YAML, поэтому их конкатенация совпадает с
+    yaml.dump всего списка. Используется C-реализация дампера, если PyYAML
+    собран с libyaml.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.entries = []
+        self.written = False
+
+    def write(self, statement: Statement, encoded: bytes, path: Optional[str]) -> None:
+        entry = {
+            'line': statement.line_num,
+            'command': statement.command,
+            'operands': statement.operands,
+            'bytes': [f"0x{b:02X}" for b in encoded]
+        }
+        if path is not None:
+            entry['file'] = path
+        self.entries.append(entry)
+        if len(self.entries) >= LOG_CHUNK_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.entries:
+            yaml.dump(self.entries, self.f, Dumper=YAML_DUMPER, sort_keys=False)
+            self.entries = []
+            self.written = True
+
+    def close(self) -> None:
+        if not self.written and not self.entries:
+            yaml.dump([], self.f, Dumper=YAML_DUMPER)
+        self.flush()
+
+class CsvLogWriter:
+    """Компактный листинг сборки в CSV: строка на инструкцию."""
+
+    def __init__(self, f):
+        self.writer = csv.writer(f)
+        self.writer.writerow(['file', 'line', 'command', 'operands', 'bytes'])
+
+    def write(self, statement: Statement, encoded: bytes, path: Optional[str]) -> None:
+        self.writer.writerow([path or '', statement.line_num, statement.command,
+                              ', '.join(statement.operands), encoded.hex(' ').upper()])
+
+    def close(self) -> None:
+        pass
+
+# Форматы лога сборки
+LOG_WRITERS = {
+    'yaml': YamlLogWriter,
+    'csv': CsvLogWriter,
+}
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import yaml
+from interpreter import VirtualMachine
+
+class BatchJob(NamedTuple):
+    """Программа для пакетного запуска и диапазон памяти для сохранения."""
+    binary: str
+    output: str
+    start: int
+    end: int
+
+def parse_memory_range(memory_range: str) -> Tuple[int, int]:
+    """Разбирает диапазон вида start-end."""
+    start, end = map(int, str(memory_range).split('-'))
+    return start, end
+
+def collect_jobs(source: str, output_dir: str, memory_range: Optional[str] = None) -> List[BatchJob]:
+    """Строит список задач из каталога с .bin файлами или из манифеста YAML.
+
+    Для каталога все программы сохраняют один диапазон memory_range.
+    Манифест - список записей {binary, memory_range[, output]}; пути
+    указываются относительно манифеста, memory_range можно опустить, если
+    он задан параметром.
+    """
+    jobs = []
+    if os.path.isdir(source):
+        if memory_range is None:
+            raise ValueError("Для каталога программ нужен диапазон памяти --memory-range")
+        start, end = parse_memory_range(memory_range)
+        for name in sorted(os.listdir(source)):
+            if name.endswith('.bin'):
+                stem = os.path.splitext(name)[0]
+                jobs.append(BatchJob(os.path.join(source, name),
+                                     os.path.join(output_dir, f"{stem}.yaml"), start, end))
+        return jobs
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, 'r') as f:
+        manifest = yaml.safe_load(f) or []
+    if not isinstance(manifest, list):
+        raise ValueError(f"Манифест {source} должен быть списком записей")
+    for index, entry in enumerate(manifest):
+        if isinstance(entry, str):
+            entry = {'binary': entry}
+        if not isinstance(entry, dict):
+            raise ValueError(f"Запись {index} манифеста должна быть строкой или словарём")
+        if 'binary' not in entry:
+            raise ValueError(f"Запись {index} манифеста не содержит binary")
+        for key in ('binary', 'output'):
+            if key in entry and not isinstance(entry[key], str):
+                raise ValueError(f"Поле {key} записи {index} манифеста должно быть строкой")
+        entry_range = entry.get('memory_range', memory_range)
+        if entry_range is None:
+            raise ValueError(f"Запись {index} манифеста не содержит memory_range")
+        start, end = parse_memory_range(entry_range)
+        binary = os.path.join(base_dir, entry['binary'])
+        # Имя дампа включает номер записи: одна программа может встречаться несколько раз
+        stem = os.path.splitext(os.path.basename(binary))[0]
+        output = entry.get('output', f"{index:04d}_{stem}.yaml")
+        jobs.append(BatchJob(binary, os.path.join(output_dir, output), start, end))
+    return jobs
+
+def group_jobs(jobs: List[BatchJob]) -> List[List[int]]:
+    """Группирует номера задач с одинаковым содержимым программы.
+
+    Программы исполняются с обнулённой памятью и детерминированы, поэтому
+    одинаковая программа загружается и выполняется один раз на группу.
+
+    Программа, которую не удалось прочитать, образует отдельную группу: ошибка
+    чтения повторится при её запуске и попадёт в результат этой задачи.
+    """
+    groups: Dict[str, List[int]] = {}
+    for index, job in enumerate(jobs):
+        try:
+            with open(job.binary, 'rb') as f:
+                key = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            key = f"unreadable:{index}"
+        groups.setdefault(key, []).append(index)
+    return list(groups.values())
+
+def _run_group(task: Tuple[List[BatchJob], int]) -> List[dict]:
+    group, memory_size = task
+    started = time.perf_counter()
+    try:
+        with open(group[0].binary, 'rb') as f:
+            program = f.read()
+        vm = VirtualMachine(memory_size)
+        vm.load_program(program)
+        vm.run()
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - started
+
+    results = []
+    for job in group:
+        result = {'binary': job.binary, 'output': job.output, 'status': 'ok'}
+        try:
+            if error is not None:
+                raise RuntimeError(error)
+            os.makedirs(os.path.dirname(os.path.abspath(job.output)), exist_ok=True)
+            vm.dump_memory(job.start, job.end, job.output)
+            result['instructions'] = len(vm.code)
+        except Exception as e:
+            result['status'] = 'failed'
+            result['error'] = str(e) if error is not None else f"{type(e).__name__}: {e}"
+        result['seconds'] = seconds
+        result['shared'] = len(group) > 1
+        results.append(result)
+    return results
+
+def run_batch(jobs: List[BatchJob], workers: Optional[int] = None, memory_size: int = 4096) -> List[dict]:
+    """Выполняет задачи, при workers > 1 - в пуле процессов. Результаты - в порядке задач."""
+    groups = group_jobs(jobs)
+    tasks = [([jobs[index] for index in group], memory_size) for group in groups]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        task_results = [_run_group(task) for task in tasks]
+    else:
+        # Время выполнения растёт с длиной программы, а длины в корпусе сильно
+        # различаются: группы отправляются в пул по одной, начиная с самых
+        # длинных программ, чтобы в конце не ждать одну долгую программу
+        order = sorted(range(len(tasks)), key=lambda i: _program_size(tasks[i][0][0]), reverse=True)
+        task_results = [None] * len(tasks)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_run_group, tasks[i]): i for i in order}
+            for future in as_completed(futures):
+                task_results[futures[future]] = future.result()
+
+    results = [None] * len(jobs)
+    for group, group_results in zip(groups, task_results):
+        for index, result in zip(group, group_results):
+            results[index] = result
+    return results
+
+def _program_size(job: BatchJob) -> int:
+    try:
+        return os.path.getsize(job.binary)
+    except OSError:
+        return 0
+
+def write_summary(results: List[dict], path: str) -> None:
+    """Сохраняет сводку пакетного запуска в YAML."""
+    summary = {
+        'programs': len(results),
+        'failed': sum(result['status'] != 'ok' for result in results),
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        yaml.dump(summary, f, sort_keys=False)
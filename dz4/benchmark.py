@@ -0,0 +1,228 @@
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from typing import Dict, Iterator, List, Tuple
+import click
+from assembler import Assembler
+from instruction import Instruction, InstructionType, encode_instruction
+from interpreter import VirtualMachine
+
+# Наборы долей команд для синтетических программ
+MIXES = {
+    'balanced': {'LOAD': 0.3, 'READ': 0.25, 'WRITE': 0.25, 'BITREV': 0.2},
+    'load': {'LOAD': 0.7, 'READ': 0.1, 'WRITE': 0.1, 'BITREV': 0.1},
+    'copy': {'LOAD': 0.1, 'READ': 0.45, 'WRITE': 0.45, 'BITREV': 0.0},
+    'bitrev': {'LOAD': 0.2, 'READ': 0.05, 'WRITE': 0.05, 'BITREV': 0.7},
+}
+
+COMMAND_TYPES = {
+    'LOAD': InstructionType.LOAD_CONST,
+    'READ': InstructionType.READ_MEMORY,
+    'WRITE': InstructionType.WRITE_MEMORY,
+    'BITREV': InstructionType.BITREVERSE,
+}
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Возвращает доли команд: имя набора из MIXES или строка вида LOAD=3,READ=1."""
+    if mix in MIXES:
+        return MIXES[mix]
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip().upper()
+        if name not in COMMAND_TYPES:
+            raise ValueError(f"Неизвестная команда в наборе: {name}")
+        weights[name] = float(weight)
+    if sum(weights.values()) <= 0:
+        raise ValueError("Сумма долей команд должна быть положительной")
+    return weights
+
+def random_instructions(count: int, seed: int = 0, mix: Dict[str, float] = MIXES['balanced'],
+                        memory_size: int = 4096) -> Iterator[Tuple[str, List[int]]]:
+    """Случайные команды (мнемоника, операнды), все адреса которых попадают в память."""
+    rng = random.Random(seed)
+    names = list(mix)
+    cum_weights = list(itertools.accumulate(mix[name] for name in names))
+    for _ in range(count):
+        name = rng.choices(names, cum_weights=cum_weights)[0]
+        if name == 'LOAD':
+            yield name, [rng.randrange(memory_size), rng.randrange(1 << 25)]
+        elif name == 'READ':
+            yield name, [rng.randrange(memory_size), rng.randrange(memory_size - 32), rng.randrange(32)]
+        else:
+            yield name, [rng.randrange(memory_size), rng.randrange(memory_size)]
+
+def generate_program(count: int, seed: int = 0, memory_size: int = 4096,
+                     mix: Dict[str, float] = MIXES['balanced']) -> bytes:
+    """Генерирует случайную программу из count инструкций в бинарном формате."""
+    return b''.join(encode_instruction(Instruction(COMMAND_TYPES[name], operands))
+                    for name, operands in random_instructions(count, seed, mix, memory_size))
+
+def generate_source(path: str, count: int, seed: int = 0, memory_size: int = 4096,
+                    mix: Dict[str, float] = MIXES['balanced']) -> None:
+    """Записывает случайную программу из count инструкций на ассемблере."""
+    with open(path, 'w') as f:
+        f.writelines(f"{name} {', '.join(map(str, operands))}\n"
+                     for name, operands in random_instructions(count, seed, mix, memory_size))
+
+def run_stepwise(vm: VirtualMachine) -> None:
+    """Исполнение по одной инструкции через execute_instruction (прежний цикл run)."""
+    while vm.pc < len(vm.program):
+        vm.execute_instruction(vm.program[vm.pc])
+        vm.pc += 1
+
+def _timed(func, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+def _environment() -> dict:
+    """Сведения о запуске, по которым сравниваются результаты разных коммитов."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+def benchmark_size(count: int, work_dir: str, seed: int, mix: Dict[str, float], repeat: int,
+                   log_format: str, dump_format: str, compiled: bool) -> dict:
+    """Замеряет ассемблирование, загрузку, исполнение и дамп программы из count инструкций."""
+    source = os.path.join(work_dir, f"program_{count}.asm")
+    binary = os.path.join(work_dir, f"program_{count}.bin")
+    generate_source(source, count, seed, mix=mix)
+
+    assemble_time = _timed(Assembler().assemble, source, binary, os.path.join(work_dir, 'assembly.log'),
+                           log_format)
+    with open(binary, 'rb') as f:
+        program = f.read()
+
+    result = {
+        'instructions': count,
+        'source_bytes': os.path.getsize(source),
+        'assemble_seconds': assemble_time,
+        'assemble_lines_per_second': count / assemble_time,
+    }
+
+    load_time = run_time = float('inf')
+    for _ in range(repeat):
+        vm = VirtualMachine()
+        load_time = min(load_time, _timed(vm.load_program, program))
+        run_time = min(run_time, _timed(vm.run))
+    result.update(load_seconds=load_time, run_seconds=run_time, run_instructions_per_second=count / run_time)
+
+    if compiled:
+        # Первый запуск компилирует программу, повторные берут код из кеша процесса
+        vm = VirtualMachine(compiled=True)
+        result['compile_seconds'] = _timed(vm.load_program, program)
+        compiled_time = _timed(vm.run)
+        for _ in range(repeat - 1):
+            vm = VirtualMachine(compiled=True)
+            vm.load_program(program)
+            compiled_time = min(compiled_time, _timed(vm.run))
+        result.update(compiled_run_seconds=compiled_time,
+                      compiled_instructions_per_second=count / compiled_time)
+
+    dump_path = os.path.join(work_dir, f"dump.{dump_format}")
+    result['dump_seconds'] = min(_timed(vm.dump_memory, 0, len(vm.memory) - 1, dump_path, dump_format)
+                                 for _ in range(repeat))
+    return result
+
+@click.group()
+def cli():
+    """Замеры скорости ассемблера и УВМ."""
+    pass
+
+@cli.command()
+@click.option('--instructions', '-n', type=int, default=200000, help='Количество инструкций в программе')
+@click.option('--seed', type=int, default=0, help='Зерно генератора программы')
+def engines(instructions: int, seed: int):
+    """Сравнивает скорость исполнения run(), run в режиме компиляции и пошагового execute_instruction."""
+    program = generate_program(instructions, seed)
+
+    engines = (
+        ('execute_instruction', dict(), run_stepwise),
+        ('run', dict(), VirtualMachine.run),
+        ('run --compile', dict(compiled=True), VirtualMachine.run),
+    )
+    results = {}
+    for name, options, runner in engines:
+        vm = VirtualMachine(**options)
+        vm.load_program(program)
+        vm.program  # список Instruction для execute_instruction строится вне замера
+        start = time.perf_counter()
+        runner(vm)
+        elapsed = time.perf_counter() - start
+        results[name] = (instructions / elapsed, vm.memory)
+        click.echo(f"{name:>20}: {instructions / elapsed:>14,.0f} инструкций/с")
+
+    baseline_speed, baseline_memory = results['execute_instruction']
+    for name, (speed, memory) in results.items():
+        if memory != baseline_memory:
+            raise click.ClickException(f"Состояние памяти после {name} различается")
+        if name != 'execute_instruction':
+            click.echo(f"Ускорение {name}: {speed / baseline_speed:.1f}x")
+
+@cli.command()
+@click.option('--sizes', default='1000,10000,100000',
+              help='Размеры программ в инструкциях через запятую')
+@click.option('--mix', default='balanced',
+              help=f"Доли команд: {', '.join(MIXES)} или вида LOAD=3,READ=1,WRITE=1,BITREV=1")
+@click.option('--seed', type=int, default=0, help='Зерно генератора программ')
+@click.option('--repeat', type=click.IntRange(min=1), default=3,
+              help='Число повторов замеров загрузки, исполнения и дампа (берётся лучший)')
+@click.option('--log-format', type=click.Choice(['yaml', 'csv']), default='csv',
+              help='Формат лога ассемблирования')
+@click.option('--dump-format', type=click.Choice(['yaml', 'json', 'csv', 'binary']), default='yaml',
+              help='Формат дампа памяти')
+@click.option('--compile', 'compiled', is_flag=True, help='Замерить также режим компиляции')
+@click.option('--output', '-o', type=click.Path(), help='Сохранить результаты в JSON файл')
+@click.option('--keep', type=click.Path(file_okay=False),
+              help='Сохранить сгенерированные программы в этот каталог')
+def suite(sizes: str, mix: str, seed: int, repeat: int, log_format: str, dump_format: str,
+          compiled: bool, output: str, keep: str):
+    """Замеряет ассемблирование, загрузку, исполнение и дамп на синтетических программах."""
+    try:
+        counts = [int(size) for size in sizes.split(',')]
+        weights = parse_mix(mix)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = keep or tmp_dir
+        os.makedirs(work_dir, exist_ok=True)
+        for count in counts:
+            result = benchmark_size(count, work_dir, seed, weights, repeat, log_format, dump_format, compiled)
+            results.append(result)
+            line = (f"{count:>9} инструкций: ассемблер {result['assemble_lines_per_second']:>10,.0f} строк/с, "
+                    f"загрузка {result['load_seconds'] * 1000:>8.1f} мс, "
+                    f"run {result['run_instructions_per_second']:>12,.0f} инструкций/с")
+            if compiled:
+                line += f", compile {result['compiled_instructions_per_second']:>12,.0f} инструкций/с"
+            click.echo(f"{line}, дамп {result['dump_seconds'] * 1000:>7.1f} мс")
+
+    if output:
+        report = {
+            'environment': _environment(),
+            'parameters': {'mix': weights, 'seed': seed, 'repeat': repeat,
+                           'log_format': log_format, 'dump_format': dump_format},
+            'results': results,
+        }
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        click.echo(f"Результаты сохранены в {output}")
+
+if __name__ == '__main__':
+    cli()
@@ -0,0 +1,146 @@
+import hashlib
+import marshal
+import os
+import sys
+from typing import Callable, Dict, List, Optional
+from instruction import DecodedProgram, InstructionType, bitreverse, bitreverse_words
+
+LOAD_CONST = InstructionType.LOAD_CONST.value
+READ_MEMORY = InstructionType.READ_MEMORY.value
+WRITE_MEMORY = InstructionType.WRITE_MEMORY.value
+BITREVERSE = InstructionType.BITREVERSE.value
+
+# Версия компилятора входит в ключ кеша: при изменении генерируемого кода старые записи не используются
+COMPILER_VERSION = '1.0'
+
+# Количество инструкций в одной сгенерированной функции: очень длинные функции
+# компилируются медленно, поэтому программа разбивается на блоки
+BLOCK_SIZE = 4096
+
+# Минимальная длина серии BITREV, которая заменяется одной операцией над срезом
+MIN_BITREV_BATCH = 4
+
+# Скомпилированные программы текущего процесса: хеш программы -> объект кода.
+# Хранятся последние CODE_CACHE_SIZE программ (словарь упорядочен по использованию)
+CODE_CACHE_SIZE = 16
+_code_cache: Dict[str, object] = {}
+
+def instruction_source(op: int, b: int, c: int, d: int) -> str:
+    """Возвращает строку Python, выполняющую инструкцию над памятью mem."""
+    if op == LOAD_CONST:
+        return f"mem[{b}] = {c}"
+    if op == READ_MEMORY:
+        return f"mem[{b}] = mem[{c + d}]"
+    if op == WRITE_MEMORY:
+        return f"mem[{c}] = mem[{b}]"
+    if op == BITREVERSE:
+        return f"mem[{b}] = bitreverse(mem[{c}])"
+    raise ValueError(f"Unknown instruction type: {op:02x}")
+
+def max_address(op: int, b: int, c: int, d: int) -> int:
+    """Наибольший адрес памяти, к которому обращается инструкция."""
+    if op == LOAD_CONST:
+        return b
+    if op == READ_MEMORY:
+        return max(b, c + d)
+    return max(b, c)
+
+def _bitrev_run_length(opcodes, b, c, start: int, end: int) -> int:
+    """Длина серии BITREV с последовательными адресами, начинающейся с start.
+
+    Серия вида BITREV b, c; BITREV b+1, c+1; ... выполняется одним срезом,
+    если диапазоны результата и источника не пересекаются или совпадают:
+    тогда ни одна команда серии не читает ячейку, записанную предыдущей.
+    """
+    length = 0
+    while (start + length < end and opcodes[start + length] == BITREVERSE
+           and b[start + length] == b[start] + length and c[start + length] == c[start] + length):
+        length += 1
+    if b[start] != c[start]:
+        # Пересечение диапазонов: укорачиваем серию до непересекающейся части
+        length = min(length, abs(b[start] - c[start]))
+    return length
+
+def _block_source(decoded: DecodedProgram, start: int, end: int) -> List[str]:
+    opcodes, b, c, d = decoded.opcodes, decoded.b, decoded.c, decoded.d
+    lines = []
+    index = start
+    while index < end:
+        if opcodes[index] == BITREVERSE:
+            length = _bitrev_run_length(opcodes, b, c, index, end)
+            if length >= MIN_BITREV_BATCH:
+                dest, src = b[index], c[index]
+                lines.append(f"mem[{dest}:{dest + length}] = bitreverse_words(mem[{src}:{src + length}])")
+                index += length
+                continue
+        lines.append(instruction_source(opcodes[index], b[index], c[index], d[index]))
+        index += 1
+    return lines
+
+def generate_source(decoded: DecodedProgram) -> str:
+    """Генерирует модуль Python: функции block_N(mem) и список blocks."""
+    lines = []
+    names = []
+    for start in range(0, len(decoded), BLOCK_SIZE):
+        name = f"block_{len(names)}"
+        names.append(name)
+        lines.append(f"def {name}(mem):")
+        end = min(start + BLOCK_SIZE, len(decoded))
+        lines.extend(f"    {source}" for source in _block_source(decoded, start, end))
+    lines.append(f"blocks = [{', '.join(names)}]")
+    return '\n'.join(lines) + '\n'
+
+def cache_key(binary_data: bytes) -> str:
+    """Ключ кеша скомпилированного кода: хеш версии компилятора и байтов программы."""
+    return hashlib.sha256(COMPILER_VERSION.encode() + b'\0' + binary_data).hexdigest()
+
+def _cache_path(cache_dir: str, key: str) -> str:
+    # Формат marshal зависит от версии интерпретатора, она входит в имя файла
+    return os.path.join(cache_dir, f"{key}.{sys.implementation.cache_tag}.uvmc")
+
+def _save_code(cache_dir: str, key: str, code) -> None:
+    """Сохраняет объект кода на диск; кеш - только оптимизация, поэтому при ошибке
+    записи программа просто не кешируется."""
+    path = _cache_path(cache_dir, key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            marshal.dump(code, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def compile_program(binary_data: bytes, decoded: DecodedProgram,
+                    cache_dir: Optional[str] = None) -> List[Callable[[list], None]]:
+    """Компилирует программу в функции Python; результат кешируется по хешу программы
+    и версии компилятора.
+
+    Если указан cache_dir, объект кода сохраняется на диск и используется
+    повторно при следующих запусках той же программы.
+    """
+    key = cache_key(binary_data)
+    # Программа извлекается и вставляется заново - так она становится последней использованной
+    code = _code_cache.pop(key, None)
+
+    if code is None and cache_dir:
+        try:
+            with open(_cache_path(cache_dir, key), 'rb') as f:
+                code = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            code = None
+
+    if code is None:
+        code = compile(generate_source(decoded), f"<uvm {key[:12]}>", 'exec')
+        if cache_dir:
+            _save_code(cache_dir, key, code)
+
+    _code_cache[key] = code
+    if len(_code_cache) > CODE_CACHE_SIZE:
+        del _code_cache[next(iter(_code_cache))]
+    namespace = {'bitreverse': bitreverse, 'bitreverse_words': bitreverse_words}
+    exec(code, namespace)
+    return namespace['blocks']
@@ -0,0 +1,32 @@
+from typing import List
+from assembler import COMMANDS
+from instruction import FIELD_LAYOUTS, INSTRUCTION_SIZE, decode_program
+
+# Код команды -> мнемоника ассемблера и число операндов
+MNEMONICS = {instruction_type.value: (name, len(FIELD_LAYOUTS[instruction_type]))
+             for name, (instruction_type, _, _) in COMMANDS.items()}
+
+def disassemble(binary_data: bytes, listing: bool = False) -> List[str]:
+    """Превращает бинарную программу в строки ассемблера.
+
+    Результат снова ассемблируется в те же байты. При listing=True к каждой
+    строке добавляется комментарий с адресом и байтами команды.
+    """
+    decoded = decode_program(binary_data)
+    lines = []
+    for index, (op, b, c, d) in enumerate(zip(decoded.opcodes, decoded.b, decoded.c, decoded.d)):
+        name, operand_count = MNEMONICS[op]
+        line = f"{name} {', '.join(map(str, (b, c, d)[:operand_count]))}"
+        if listing:
+            offset = index * INSTRUCTION_SIZE
+            encoded = binary_data[offset:offset + INSTRUCTION_SIZE]
+            line = f"{line:<32}; {offset:06X}: {encoded.hex(' ').upper()}"
+        lines.append(line)
+    return lines
+
+def disassemble_file(binary_path: str, output_path: str, listing: bool = False) -> None:
+    """Дизассемблирует бинарный файл в исходный текст."""
+    with open(binary_path, 'rb') as f:
+        lines = disassemble(f.read(), listing)
+    with open(output_path, 'w') as f:
+        f.writelines(f"{line}\n" for line in lines)
@@ -1,5 +1,8 @@
+import sys
+from array import array
 from dataclasses import dataclass
 from enum import Enum, auto
+from typing import List
 
 class InstructionType(Enum):
     LOAD_CONST = 0x3C    # биты 0-5: 111100
@@ -13,108 +16,158 @@ class Instruction:
     operands: list[int]
     size: int = 6  # все команды имеют размер 6 байт
 
+# Таблицы разворота: 8-битная строится напрямую, 16-битная - из двух 8-битных
+REVERSED_BYTES = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+REVERSED_16 = array('H', [REVERSED_BYTES[i & 0xFF] << 8 | REVERSED_BYTES[i >> 8] for i in range(1 << 16)])
+
 def bitreverse(value: int) -> int:
     """Выполняет операцию bitreverse над 32-битным значением."""
-    # Убеждаемся, что значение — строго 32-битное
-    value &= 0xFFFFFFFF  # Обрезаем до 32 бит
-    binary = f"{value:032b}"  # Преобразуем в строку двоичного числа длиной 32 бита
-    reversed_binary = binary[::-1]  # Разворачиваем строку
-    return int(reversed_binary, 2)  # Возвращаем число, преобразованное обратно в int
-
+    # Значение обрезается до 32 бит, каждая 16-битная половина разворачивается
+    # по таблице, и половины меняются местами
+    value &= 0xFFFFFFFF
+    return (REVERSED_16[value & 0xFFFF] << 16) | REVERSED_16[value >> 16]
+
+def bitreverse_words(values) -> array:
+    """Выполняет bitreverse над массивом 32-битных слов целиком.
+
+    Разворот 32-битного слова - это разворот битов в каждом байте и
+    перестановка байтов в обратном порядке; обе операции выполняются
+    встроенными bytes.translate и array.byteswap без цикла на Python.
+    values - array или memoryview с 4-байтовыми элементами.
+    """
+    result = array(values.typecode if isinstance(values, array) else values.format)
+    if result.itemsize != 4:
+        raise ValueError("bitreverse_words ожидает 32-битные элементы")
+    result.frombytes(values.tobytes().translate(REVERSED_BYTES))
+    result.byteswap()
+    return result
+
+
+# Раскладка полей команды: для каждого типа - операнды по порядку, для каждого
+# операнда (смещение в битах, ширина). Поле A (код команды) - всегда биты 0-5.
+# Из этой таблицы строятся процедуры кодирования и декодирования ниже
+INSTRUCTION_SIZE = 6  # все команды имеют размер 6 байт = 48 бит
+OPCODE_MASK = 0x3F
+FIELD_NAMES = ('b', 'c', 'd')
+FIELD_LAYOUTS = {
+    InstructionType.LOAD_CONST: ((6, 12), (18, 25)),             # B: адрес, C: константа
+    InstructionType.READ_MEMORY: ((6, 12), (18, 12), (30, 5)),   # B: адрес, C: адрес, D: смещение
+    InstructionType.WRITE_MEMORY: ((6, 12), (18, 12)),           # B: адрес, C: адрес
+    InstructionType.BITREVERSE: ((6, 12), (18, 12)),             # B: адрес, C: адрес
+}
+
+def _field_source(field) -> str:
+    if field is None:
+        return '0'
+    offset, width = field
+    return f"(w >> {offset}) & {(1 << width) - 1:#x}"
+
+def _pack_source(instruction_type: InstructionType) -> str:
+    # lambda b, c[, d]: (код | (b & маска) << смещение | ...).to_bytes(6, 'little')
+    fields = FIELD_LAYOUTS[instruction_type]
+    params = FIELD_NAMES[:len(fields)]
+    terms = [str(instruction_type.value)]
+    terms += [f"({name} & {(1 << width) - 1:#x}) << {offset}"
+              for name, (offset, width) in zip(params, fields)]
+    return f"lambda {', '.join(params)}: ({' | '.join(terms)}).to_bytes({INSTRUCTION_SIZE}, 'little')"
+
+def _unpack_source(instruction_type: InstructionType) -> str:
+    # lambda w: [(w >> смещение) & маска, ...] для 48-битного слова команды
+    fields = FIELD_LAYOUTS[instruction_type]
+    return f"lambda w: [{', '.join(map(_field_source, fields))}]"
+
+# Процедуры кодирования и декодирования по коду команды
+INSTRUCTION_TYPES = {t.value: t for t in InstructionType}
+PACKERS = {t.value: eval(_pack_source(t)) for t in InstructionType}
+UNPACKERS = {t.value: eval(_unpack_source(t)) for t in InstructionType}
 
 def encode_instruction(instruction: Instruction) -> bytes:
     """Кодирует инструкцию в последовательность байтов."""
-    data = bytearray(6)  # 6 байт = 48 бит
-
-    # Тип команды всегда в битах 0-5 первого байта
-    data[0] = instruction.type.value  # Записываем полный код команды
-
-    if instruction.type == InstructionType.LOAD_CONST:
-        # B (биты 6-17): 12 бит
-        b_value = instruction.operands[0] & 0xFFF  # 12 бит
-        data[0] |= (b_value & 0x3) << 6  # 2 младших бита в первый байт
-        data[1] = (b_value >> 2) & 0xFF  # следующие 8 бит во второй байт
-        data[2] = (b_value >> 10) & 0x3  # 2 старших бита в третий байт
-        
-        # C (биты 18-42): 25 бит
-        c_value = instruction.operands[1] & 0x1FFFFFF  # 25 бит
-        data[2] |= (c_value & 0x3F) << 2  # 6 бит в третий байт
-        data[3] = (c_value >> 6) & 0xFF   # 8 бит в четвертый байт
-        data[4] = (c_value >> 14) & 0xFF  # 8 бит в пятый байт
-        data[5] = (c_value >> 22) & 0x7   # 3 бита в шестой байт
-
-    elif instruction.type == InstructionType.READ_MEMORY:
-        # B (биты 6-17): 12 бит
-        b_value = instruction.operands[0] & 0xFFF
-        data[0] |= (b_value & 0x3) << 6
-        data[1] = (b_value >> 2) & 0xFF
-        data[2] = (b_value >> 10) & 0x3
-
-        # C (биты 18-29): 12 бит
-        c_value = instruction.operands[1] & 0xFFF
-        data[2] |= (c_value & 0x3F) << 2
-        data[3] = (c_value >> 6) & 0x3F
-
-        # D (биты 30-34): 5 бит
-        d_value = instruction.operands[2] & 0x1F
-        data[3] |= (d_value & 0x3) << 6
-        data[4] = (d_value >> 2) & 0x7
-
-    elif instruction.type == InstructionType.WRITE_MEMORY:
-        # B (биты 6-17): 12 бит
-        b_value = instruction.operands[0] & 0xFFF
-        data[0] |= (b_value & 0x3) << 6
-        data[1] = (b_value >> 2) & 0xFF
-        data[2] = (b_value >> 10) & 0x3
-
-        # C (биты 18-29): 12 бит
-        c_value = instruction.operands[1] & 0xFFF
-        data[2] |= (c_value & 0x3F) << 2
-        data[3] = (c_value >> 6) & 0x3F
-
-    elif instruction.type == InstructionType.BITREVERSE:
-        # B (биты 6-17): 12 бит
-        b_value = instruction.operands[0] & 0xFFF
-        data[0] |= (b_value & 0x3) << 6
-        data[1] = (b_value >> 2) & 0xFF
-        data[2] = (b_value >> 10) & 0x3
-        # C (биты 18-29): 12 бит
-        c_value = instruction.operands[1] & 0xFFF
-        data[2] |= (c_value & 0x3F) << 2
-        data[3] = (c_value >> 6) & 0x3F
-    return bytes(data)
+    # Операнды обрезаются до ширины своих полей
+    return PACKERS[instruction.type.value](*instruction.operands)
 
 def decode_instruction(data: bytes) -> Instruction:
     """Декодирует последовательность байтов в инструкцию."""
-    if len(data) != 6:
+    if len(data) != INSTRUCTION_SIZE:
         raise ValueError("Invalid instruction length")
 
-    # Получаем тип команды из первого байта
-    instruction_type = data[0] & 0x3F  # Маскируем биты 6-7
-    
-    # Для всех команд B находится в битах 6-17
-    b_value = ((data[0] >> 6) & 0x3) | (data[1] << 2) | ((data[2] & 0x3) << 10)
-
-    if instruction_type == InstructionType.LOAD_CONST.value:
-        # C (биты 18-42): 25 бит
-        c_value = ((data[2] >> 2) & 0x3F) | (data[3] << 6) | (data[4] << 14) | ((data[5] & 0x7) << 22)
-        return Instruction(InstructionType.LOAD_CONST, [b_value, c_value])
-
-    elif instruction_type == InstructionType.READ_MEMORY.value:
-        # C (биты 18-29): 12 бит
-        c_value = ((data[2] >> 2) & 0x3F) | ((data[3] & 0x3F) << 6)
-        # D (биты 30-34): 5 бит
-        d_value = ((data[3] >> 6) & 0x3) | ((data[4] & 0x7) << 2)
-        return Instruction(InstructionType.READ_MEMORY, [b_value, c_value, d_value])
-
-    elif instruction_type == InstructionType.WRITE_MEMORY.value:
-        # C (биты 18-29): 12 бит
-        c_value = ((data[2] >> 2) & 0x3F) | ((data[3] & 0x3F) << 6)
-        return Instruction(InstructionType.WRITE_MEMORY, [b_value, c_value])
-
-    elif instruction_type == InstructionType.BITREVERSE.value:
-        # C (биты 18-29): 12 бит
-        c_value = ((data[2] >> 2) & 0x3F) | ((data[3] & 0x3F) << 6)
-        return Instruction(InstructionType.BITREVERSE, [b_value, c_value])
-
-    raise ValueError(f"Unknown instruction type: {instruction_type:02x}")
+    word = int.from_bytes(data, 'little')
+    instruction_type = word & OPCODE_MASK
+    unpack = UNPACKERS.get(instruction_type)
+    if unpack is None:
+        raise ValueError(f"Unknown instruction type: {instruction_type:02x}")
+    return Instruction(INSTRUCTION_TYPES[instruction_type], unpack(word))
+
+def _column_source(index: int) -> str:
+    """Выражение, извлекающее index-й операнд из 64-битного слова w команды.
+
+    Команды группируются по одинаковым (смещению, ширине) поля; самая большая
+    группа (или отсутствие поля, дающее 0) становится веткой по умолчанию.
+    """
+    groups = {}
+    for instruction_type, fields in FIELD_LAYOUTS.items():
+        field = fields[index] if index < len(fields) else None
+        groups.setdefault(field, []).append(instruction_type.value)
+    ordered = sorted(groups.items(), key=lambda item: len(item[1]))
+    source = _field_source(ordered[-1][0])
+    for field, opcodes in ordered[:-1]:
+        condition = f"w & {OPCODE_MASK:#x} " + (f"== {opcodes[0]}" if len(opcodes) == 1 else f"in {tuple(opcodes)}")
+        source = f"{_field_source(field)} if {condition} else {source}"
+    return source
+
+# Извлечение столбцов b, c, d из списка слов команд; генерируется из FIELD_LAYOUTS
+_extract_columns = eval(
+    f"lambda words: ({', '.join(f'[{_column_source(i)} for w in words]' for i in range(len(FIELD_NAMES)))})")
+
+# Таблица для bytes.translate: оставляет в байте только код команды (биты 0-5)
+OPCODE_TABLE = bytes(i & OPCODE_MASK for i in range(256))
+OPCODES = frozenset(INSTRUCTION_TYPES)
+
+@dataclass
+class DecodedProgram:
+    """Программа в столбцовом виде: i-й элемент каждого столбца относится к i-й инструкции.
+
+    Поле d заполняется только для READ_MEMORY, у остальных команд оно равно 0.
+    """
+    opcodes: bytes
+    b: array  # 'H', биты 6-17
+    c: array  # 'I', биты 18-42 у LOAD_CONST и 18-29 у остальных команд
+    d: array  # 'B', биты 30-34 у READ_MEMORY
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+    def instruction(self, index: int) -> Instruction:
+        """Собирает объект Instruction для одной инструкции."""
+        instruction_type = INSTRUCTION_TYPES[self.opcodes[index]]
+        operands = [self.b[index], self.c[index], self.d[index]]
+        return Instruction(instruction_type, operands[:len(FIELD_LAYOUTS[instruction_type])])
+
+    def instructions(self) -> List[Instruction]:
+        return [self.instruction(i) for i in range(len(self))]
+
+def decode_program(data: bytes) -> DecodedProgram:
+    """Декодирует всю программу сразу, без объекта Instruction на каждую команду.
+
+    Байты программы раскладываются в 64-битные слова (6 байт команды + 2 нулевых),
+    после чего поля извлекаются масками и сдвигами из FIELD_LAYOUTS по целым столбцам.
+    Неполная последняя команда игнорируется, как и в load_program.
+    """
+    count = len(data) // INSTRUCTION_SIZE
+    size = count * INSTRUCTION_SIZE
+    padded = bytearray(count * 8)
+    for i in range(INSTRUCTION_SIZE):
+        padded[i::8] = data[i:size:INSTRUCTION_SIZE]
+    words = array('Q')
+    words.frombytes(padded)
+    if sys.byteorder != 'little':
+        words.byteswap()
+
+    opcodes = data[0:size:INSTRUCTION_SIZE].translate(OPCODE_TABLE)
+    unknown = set(opcodes) - OPCODES
+    if unknown:
+        index = next(i for i, op in enumerate(opcodes) if op in unknown)
+        raise ValueError(f"Unknown instruction type: {opcodes[index]:02x} (instruction {index})")
+
+    b, c, d = _extract_columns(words)
+    return DecodedProgram(opcodes=opcodes, b=array('H', b), c=array('I', c), d=array('B', d))
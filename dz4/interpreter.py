@@ -1,23 +1,143 @@
-import yaml
-from typing import List, Dict
-from instruction import Instruction, InstructionType, decode_instruction, bitreverse
+import csv
+import gc
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import List, Dict, Optional
+from instruction import Instruction, InstructionType, DecodedProgram, decode_program, bitreverse, bitreverse_words
+from compiler import compile_program, max_address
+
+# Ячейка памяти - беззнаковое 32-битное слово
+MEMORY_TYPECODE = 'I' if array('I').itemsize == 4 else 'L'
+WORD_SIZE = 4
+WORD_MASK = 0xFFFFFFFF  # значения, записываемые в память, берутся по модулю 2**32
+
+# Заголовок контрольной точки: сигнатура, версия формата, pc, число слов памяти,
+# sha256 программы; за ним следует память как 32-битные слова little-endian
+CHECKPOINT_MAGIC = b'UVMC'
+CHECKPOINT_VERSION = 1
+CHECKPOINT_HEADER = struct.Struct('<4sIQQ32s')
+
+def allocate_memory(memory_size: int) -> array:
+    """Создаёт обнулённую память из memory_size 32-битных слов."""
+    return array(MEMORY_TYPECODE, bytes(memory_size * WORD_SIZE))
+
+# Фабрики обработчиков принимают все поля команды (b, c, d); лишние игнорируются
+
+def _load_const(memory, addr, const, _):
+    const &= WORD_MASK
+    def step():
+        memory[addr] = const
+    return step
+
+def _read_memory(memory, dest, src, offset):
+    # Адрес источника src + offset вычисляется один раз при загрузке
+    src += offset
+    def step():
+        memory[dest] = memory[src]
+    return step
+
+def _write_memory(memory, src, dest, _):
+    def step():
+        memory[dest] = memory[src]
+    return step
+
+def _bitreverse(memory, result_addr, src_addr, _):
+    def step():
+        memory[result_addr] = bitreverse(memory[src_addr])
+    return step
+
+# Фабрики обработчиков по коду команды: по полям инструкции создают замыкание
+# с уже связанными операндами
+HANDLERS = {
+    InstructionType.LOAD_CONST.value: _load_const,
+    InstructionType.READ_MEMORY.value: _read_memory,
+    InstructionType.WRITE_MEMORY.value: _write_memory,
+    InstructionType.BITREVERSE.value: _bitreverse,
+}
+
+def program_max_address(decoded: DecodedProgram) -> int:
+    """Наибольший адрес памяти, к которому обращается программа (-1 для пустой)."""
+    return max(map(max_address, decoded.opcodes, decoded.b, decoded.c, decoded.d), default=-1)
+
+def validate_program(decoded: DecodedProgram, memory_size: int) -> None:
+    """Проверяет, что все адреса программы попадают в память размером memory_size.
+
+    Вызывается при загрузке программы и при замене памяти. Программа с адресом
+    за пределами памяти не загружается, поэтому при исполнении адреса не
+    проверяются и ошибка не может возникнуть посреди выполнения.
+    """
+    if program_max_address(decoded) < memory_size:
+        return
+    for index, address in enumerate(map(max_address, decoded.opcodes, decoded.b, decoded.c, decoded.d)):
+        if address >= memory_size:
+            raise IndexError(f"Инструкция {index} обращается к адресу {address} "
+                             f"за пределами памяти размером {memory_size}")
 
 class VirtualMachine:
-    def __init__(self, memory_size: int = 4096):
-        self.memory = [0] * memory_size
+    def __init__(self, memory_size: int = 4096, compiled: bool = False,
+                 cache_dir: Optional[str] = None):
+        # Память хранится компактно: array 32-битных слов или memoryview над mmap снимка
+        self.memory = allocate_memory(memory_size)
+        self._snapshot_map = None
         self.pc = 0  # program counter
+        self.decoded = DecodedProgram(b'', array('H'), array('I'), array('B'))
+        self._program = None
+        self.code = []  # предекодированные обработчики, по одному на инструкцию
+        # Режим компиляции программы в функции Python (см. compiler.py)
+        self.compiled = compiled
+        self.cache_dir = cache_dir
+        self.blocks = None
+        self.program_hash = hashlib.sha256(b'').digest()
 
     def load_program(self, binary_data: bytes) -> None:
         """Загружает программу в память."""
-        self.program = []
-        offset = 0
-        while offset < len(binary_data):
-            instr_bytes = binary_data[offset:offset + 6]
-            if len(instr_bytes) < 6:
-                break
-            self.program.append(decode_instruction(instr_bytes))
-            offset += 6
-        self.pc = 0
+        # Загрузка создаёт много мелких объектов; сборщик мусора на это время
+        # отключается, иначе он многократно обходил бы их при загрузке
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            # Программа декодируется целиком в столбцы, без объекта на инструкцию
+            decoded = decode_program(binary_data)
+            validate_program(decoded, len(self.memory))
+            self.decoded = decoded
+            self.program_hash = hashlib.sha256(binary_data).digest()
+            self._program = None
+            self.pc = 0
+            self.compile_handlers()
+            self.blocks = None
+            if self.compiled:
+                self.blocks = compile_program(binary_data, self.decoded, self.cache_dir)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    @property
+    def program(self) -> List[Instruction]:
+        """Программа в виде объектов Instruction; создаётся только по запросу."""
+        if self._program is None:
+            self._program = self.decoded.instructions()
+        return self._program
+
+    def max_address(self) -> int:
+        """Наибольший адрес памяти, к которому обращается программа (-1 для пустой)."""
+        return program_max_address(self.decoded)
+
+    def compile_handlers(self) -> None:
+        """Превращает программу в таблицу замыканий, связанных с памятью и операндами.
+
+        Обработчики строятся прямо из столбцов декодированной программы.
+        Вызывается при загрузке программы; если self.memory заменяется другим
+        объектом, таблицу нужно построить заново.
+        """
+        memory = self.memory
+        decoded = self.decoded
+        self.code = [HANDLERS[op](memory, b, c, d)
+                     for op, b, c, d in zip(decoded.opcodes, decoded.b, decoded.c, decoded.d)]
 
     def execute_instruction(self, instr: Instruction) -> None:
         """Выполняет одну инструкцию."""
@@ -25,7 +145,7 @@ class VirtualMachine:
             # B: адрес для записи
             # C: константа для записи
             addr, const = instr.operands
-            self.memory[addr] = const
+            self.memory[addr] = const & WORD_MASK
 
         elif instr.type == InstructionType.READ_MEMORY:
             # B: адрес назначения
@@ -49,21 +169,161 @@ class VirtualMachine:
             value = self.memory[src_addr]  # Получаем значение из памяти по адресу источника
             self.memory[result_addr] = bitreverse(value)  # Записываем результат по адресу назначения
 
-    def run(self) -> None:
-        """Выполняет программу."""
-        while self.pc < len(self.program):
-            self.execute_instruction(self.program[self.pc])
-            self.pc += 1
-
-    def dump_memory(self, start: int, end: int, output_path: str) -> None:
-        """Сохраняет содержимое памяти в указанном диапазоне."""
-        memory_dump = {
-            'memory_range': {
-                'start': start,
-                'end': end
-            },
-            'values': {i: self.memory[i] for i in range(start, end + 1)}
-        }
-        
-        with open(output_path, 'w') as f:
-            yaml.dump(memory_dump, f, sort_keys=False)
+    def run(self, profiler=None, steps: Optional[int] = None) -> None:
+        """Выполняет программу.
+
+        С profiler (см. profiler.py) исполнение идёт через отдельный
+        инструментированный цикл по таблице обработчиков. steps ограничивает
+        число выполняемых инструкций: после остановки состояние можно сохранить
+        в контрольную точку и продолжить следующим вызовом run.
+        """
+        code = self.code
+        end = len(code) if steps is None else min(len(code), self.pc + steps)
+        if profiler is not None:
+            profiler.run(self, end)
+            return
+
+        if self.blocks is not None and self.pc == 0 and end == len(code):
+            memory = self.memory
+            for block in self.blocks:
+                block(memory)
+            self.pc = len(code)
+            return
+
+        # Инструкций перехода нет, поэтому обработчики вызываются подряд с текущего pc.
+        # Все адреса программы проверены при загрузке (validate_program), так что
+        # обращение к памяти не может завершиться ошибкой посреди выполнения
+        for step in code[self.pc:end]:
+            step()
+        self.pc = end
+
+    @property
+    def finished(self) -> bool:
+        return self.pc >= len(self.code)
+
+    def bitreverse_range(self, dest: int, src: int, count: int) -> None:
+        """Выполняет BITREV над count ячейками подряд: dest+i <- bitreverse(src+i).
+
+        Источник читается целиком до записи результата.
+        """
+        if min(dest, src) < 0 or max(dest, src) + count > len(self.memory):
+            raise IndexError("Диапазон bitreverse выходит за пределы памяти")
+        self.memory[dest:dest + count] = bitreverse_words(self.memory[src:src + count])
+
+    def dump_memory(self, start: int, end: int, output_path: str, format: str = 'yaml') -> None:
+        """Сохраняет содержимое памяти в указанном диапазоне.
+
+        format: 'yaml' (по умолчанию), 'json', 'csv' или 'binary' - слова
+        диапазона как 32-битные числа little-endian.
+        """
+        if format not in DUMP_FORMATS:
+            raise ValueError(f"Неизвестный формат дампа: {format}")
+        if start < 0 or end >= len(self.memory) or start > end:
+            raise IndexError(f"Диапазон {start}-{end} выходит за пределы памяти размером {len(self.memory)}")
+        with open(output_path, 'wb' if format == 'binary' else 'w') as f:
+            DUMP_FORMATS[format](f, start, end, self.memory[start:end + 1])
+
+    def save_snapshot(self, path: str) -> None:
+        """Сохраняет всю память в файл как последовательность 32-битных слов little-endian."""
+        with open(path, 'wb') as f:
+            _write_words(f, self.memory)
+
+    def save_checkpoint(self, path: str) -> None:
+        """Сохраняет состояние машины: pc и всю память, вместе с хешем программы.
+
+        Выполнение можно продолжить с этого места: load_program с той же
+        программой, load_checkpoint и run.
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, self.pc,
+                                           len(self.memory), self.program_hash))
+            _write_words(f, self.memory)
+        os.replace(tmp_path, path)
+
+    def load_checkpoint(self, path: str) -> None:
+        """Восстанавливает pc и память из контрольной точки для загруженной программы."""
+        with open(path, 'rb') as f:
+            header = f.read(CHECKPOINT_HEADER.size)
+            if len(header) != CHECKPOINT_HEADER.size:
+                raise ValueError(f"{path} не является контрольной точкой УВМ")
+            magic, version, pc, memory_size, program_hash = CHECKPOINT_HEADER.unpack(header)
+            if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+                raise ValueError(f"{path} не является контрольной точкой УВМ")
+            if program_hash != self.program_hash:
+                raise ValueError(f"Контрольная точка {path} создана для другой программы")
+            if pc > len(self.code):
+                raise ValueError(f"pc {pc} контрольной точки за пределами программы")
+            memory = array(MEMORY_TYPECODE)
+            try:
+                memory.fromfile(f, memory_size)
+            except EOFError:
+                raise ValueError(f"Контрольная точка {path} обрезана")
+        if sys.byteorder != 'little':
+            memory.byteswap()
+        self._set_memory(memory, None)
+        self.pc = pc
+
+    def load_snapshot(self, path: str, writable: bool = False) -> None:
+        """Заменяет память содержимым файла снимка, отображая его в память через mmap.
+
+        Размер памяти становится равным размеру снимка. Ячейки не копируются:
+        страницы файла подгружаются по мере обращения. При writable=False
+        отображение копируется при записи и файл не изменяется.
+        """
+        with open(path, 'r+b' if writable else 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0 or size % WORD_SIZE:
+                raise ValueError(f"Размер снимка {path} не кратен {WORD_SIZE} байтам")
+            if sys.byteorder != 'little':
+                memory = array(MEMORY_TYPECODE)
+                memory.fromfile(f, size // WORD_SIZE)
+                memory.byteswap()
+                self._set_memory(memory, None)
+                return
+            snapshot_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_COPY)
+        self._set_memory(memoryview(snapshot_map).cast(MEMORY_TYPECODE), snapshot_map)
+
+    def _set_memory(self, memory, snapshot_map) -> None:
+        # Загруженная программа должна помещаться и в новую память
+        validate_program(self.decoded, len(memory))
+        self.memory = memory
+        self._snapshot_map = snapshot_map
+        # Обработчики связаны с прежним объектом памяти
+        self.compile_handlers()
+
+def _write_words(f, words) -> None:
+    """Записывает 32-битные слова в файл в порядке little-endian."""
+    if sys.byteorder == 'little':
+        f.write(words)
+    else:
+        data = array(MEMORY_TYPECODE, words)
+        data.byteswap()
+        data.tofile(f)
+
+# Форматы дампа памяти: функция (файл, start, end, значения диапазона)
+
+def _dump_yaml(f, start: int, end: int, values) -> None:
+    # Совпадает с yaml.dump словаря {memory_range, values}, но пишется напрямую:
+    # все значения - целые числа, и представитель PyYAML не нужен
+    f.write(f"memory_range:\n  start: {start}\n  end: {end}\nvalues:\n")
+    f.writelines(f"  {address}: {value}\n" for address, value in enumerate(values.tolist(), start))
+
+def _dump_json(f, start: int, end: int, values) -> None:
+    json.dump({'memory_range': {'start': start, 'end': end}, 'values': values.tolist()},
+              f, separators=(',', ':'))
+
+def _dump_csv(f, start: int, end: int, values) -> None:
+    writer = csv.writer(f, lineterminator='\n')
+    writer.writerow(['address', 'value'])
+    writer.writerows(zip(range(start, end + 1), values.tolist()))
+
+def _dump_binary(f, start: int, end: int, values) -> None:
+    _write_words(f, values)
+
+DUMP_FORMATS = {
+    'yaml': _dump_yaml,
+    'json': _dump_json,
+    'csv': _dump_csv,
+    'binary': _dump_binary,
+}
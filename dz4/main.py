@@ -1,6 +1,12 @@
+import os
 import click
+import yaml
 from assembler import Assembler
-from interpreter import VirtualMachine
+from batch import collect_jobs, run_batch, write_summary
+from disassembler import disassemble_file
+from interpreter import DUMP_FORMATS, VirtualMachine
+from optimizer import compare_programs, optimize_program
+from profiler import Profiler
 
 @click.group()
 def cli():
@@ -11,23 +17,60 @@ def cli():
 @click.argument('source', type=click.Path(exists=True))
 @click.argument('output', type=click.Path())
 @click.argument('log', type=click.Path())
-def assemble(source: str, output: str, log: str):
+@click.option('--log-format', type=click.Choice(['yaml', 'csv']), default='yaml',
+              help='Формат лога: YAML или компактный листинг CSV')
+def assemble(source: str, output: str, log: str, log_format: str):
     """Ассемблирует исходный код в бинарный файл."""
     assembler = Assembler()
     try:
-        assembler.assemble(source, output, log)
+        assembler.assemble(source, output, log, log_format)
         click.echo(f"Программа успешно ассемблирована в {output}")
         click.echo(f"Лог сохранен в {log}")
     except Exception as e:
         click.echo(f"Ошибка при ассемблировании: {str(e)}", err=True)
         raise click.Abort()
 
+@cli.command()
+@click.argument('binary', type=click.Path(exists=True))
+@click.argument('output', type=click.Path())
+@click.option('--listing', is_flag=True, help='Добавить к строкам адрес и байты команды')
+def disassemble(binary: str, output: str, listing: bool):
+    """Дизассемблирует бинарный файл в исходный код."""
+    try:
+        disassemble_file(binary, output, listing)
+        click.echo(f"Программа дизассемблирована в {output}")
+    except Exception as e:
+        click.echo(f"Ошибка при дизассемблировании: {str(e)}", err=True)
+        raise click.Abort()
+
 @cli.command()
 @click.argument('binary', type=click.Path(exists=True))
 @click.argument('output', type=click.Path())
 @click.option('--memory-range', '-m', type=str, required=True,
               help='Диапазон памяти для вывода (start-end)')
-def run(binary: str, output: str, memory_range: str):
+@click.option('--memory-size', type=click.IntRange(min=1), default=4096, show_default=True,
+              help='Размер памяти в 32-битных словах (со снимком - размер снимка)')
+@click.option('--compile', 'compiled', is_flag=True,
+              help='Скомпилировать программу в функции Python (кеш в __uvmcache__ рядом с программой)')
+@click.option('--snapshot', type=click.Path(exists=True),
+              help='Начальное состояние памяти из снимка (32-битные слова little-endian)')
+@click.option('--save-snapshot', type=click.Path(),
+              help='Сохранить всю память после выполнения в файл снимка')
+@click.option('--profile', type=click.Path(),
+              help='Профилировать исполнение и сохранить отчёт в YAML файл')
+@click.option('--trace', type=int, default=0,
+              help='Добавить в отчёт профиля последние N выполненных инструкций')
+@click.option('--format', 'dump_format', type=click.Choice(list(DUMP_FORMATS)), default='yaml',
+              help='Формат дампа памяти: yaml, json, csv или binary (32-битные слова little-endian)')
+@click.option('--steps', type=click.IntRange(min=0),
+              help='Выполнить не больше N инструкций')
+@click.option('--checkpoint', type=click.Path(),
+              help='Сохранить контрольную точку (pc и память) после выполнения')
+@click.option('--resume', type=click.Path(exists=True),
+              help='Продолжить выполнение с контрольной точки')
+def run(binary: str, output: str, memory_range: str, memory_size: int, compiled: bool,
+        snapshot: str, save_snapshot: str, profile: str, trace: int,
+        dump_format: str, steps: int, checkpoint: str, resume: str):
     """Выполняет бинарный файл на виртуальной машине."""
     try:
         start, end = map(int, memory_range.split('-'))
@@ -35,20 +78,102 @@ def run(binary: str, output: str, memory_range: str):
         click.echo("Неверный формат диапазона памяти. Используйте формат: start-end", err=True)
         raise click.Abort()
 
-    vm = VirtualMachine()
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(binary)), '__uvmcache__')
+    vm = VirtualMachine(memory_size, compiled=compiled, cache_dir=cache_dir)
     try:
         with open(binary, 'rb') as f:
             program = f.read()
         
+        if snapshot:
+            vm.load_snapshot(snapshot)
         vm.load_program(program)
-        vm.run()
-        vm.dump_memory(start, end, output)
+        if resume:
+            vm.load_checkpoint(resume)
+        profiler = Profiler(trace) if profile else None
+        vm.run(profiler, steps)
+        vm.dump_memory(start, end, output, dump_format)
+        if save_snapshot:
+            vm.save_snapshot(save_snapshot)
+        if checkpoint:
+            vm.save_checkpoint(checkpoint)
         
-        click.echo(f"Программа успешно выполнена")
+        if vm.finished:
+            click.echo(f"Программа успешно выполнена")
+        else:
+            click.echo(f"Выполнение остановлено на инструкции {vm.pc} из {len(vm.code)}")
         click.echo(f"Результат сохранен в {output}")
+        if checkpoint:
+            click.echo(f"Контрольная точка сохранена в {checkpoint}")
+        if profiler is not None:
+            profiler.save(profile, vm)
+            click.echo(f"Профиль сохранен в {profile}")
     except Exception as e:
         click.echo(f"Ошибка при выполнении: {str(e)}", err=True)
         raise click.Abort()
 
+@cli.command()
+@click.argument('binary', type=click.Path(exists=True))
+@click.argument('output', type=click.Path())
+@click.option('--verify', is_flag=True,
+              help='Выполнить исходную и оптимизированную программы и сравнить память')
+@click.option('--memory-size', type=click.IntRange(min=1), default=4096, show_default=True,
+              help='Размер памяти в 32-битных словах')
+def optimize(binary: str, output: str, verify: bool, memory_size: int):
+    """Оптимизирует бинарный файл: свёртка констант, удаление лишних записей и копирований."""
+    try:
+        with open(binary, 'rb') as f:
+            program = f.read()
+        optimized, stats = optimize_program(program, memory_size)
+        with open(output, 'wb') as f:
+            f.write(optimized)
+        click.echo(f"Инструкций: {stats.instructions} -> {stats.optimized} "
+                   f"(свёрнуто констант: {stats.folded}, лишних записей: {stats.redundant}, "
+                   f"мёртвых записей: {stats.dead})")
+        click.echo(f"Оптимизированная программа сохранена в {output}")
+    except Exception as e:
+        click.echo(f"Ошибка при оптимизации: {str(e)}", err=True)
+        raise click.Abort()
+
+    if verify:
+        try:
+            differences = compare_programs(program, optimized, memory_size)
+        except Exception as e:
+            click.echo(f"Ошибка при проверке: {str(e)}", err=True)
+            raise click.Abort()
+        if differences:
+            click.echo(f"Память различается по адресам: {', '.join(map(str, differences[:10]))}", err=True)
+            raise click.Abort()
+        click.echo("Состояние памяти совпадает с исходной программой")
+
+@cli.command('run-batch')
+@click.argument('source', type=click.Path(exists=True))
+@click.argument('output_dir', type=click.Path(file_okay=False))
+@click.option('--memory-range', '-m', type=str,
+              help='Диапазон памяти для вывода (start-end); для манифеста - по умолчанию')
+@click.option('--memory-size', type=click.IntRange(min=1), default=4096, show_default=True,
+              help='Размер памяти в 32-битных словах')
+@click.option('--jobs', '-j', type=click.IntRange(min=1),
+              help='Число процессов (по умолчанию - число ядер)')
+def run_batch_command(source: str, output_dir: str, memory_range: str, memory_size: int, jobs: int):
+    """Выполняет все программы каталога или манифеста YAML в пуле процессов."""
+    try:
+        batch_jobs = collect_jobs(source, output_dir, memory_range)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        click.echo(f"Ошибка в списке программ: {str(e)}", err=True)
+        raise click.Abort()
+
+    results = run_batch(batch_jobs, jobs, memory_size)
+    os.makedirs(output_dir, exist_ok=True)
+    summary_path = os.path.join(output_dir, 'summary.yaml')
+    write_summary(results, summary_path)
+
+    failed = [result for result in results if result['status'] != 'ok']
+    for result in failed:
+        click.echo(f"{result['binary']}: {result['error']}", err=True)
+    click.echo(f"Выполнено программ: {len(results) - len(failed)} из {len(results)}")
+    click.echo(f"Сводка сохранена в {summary_path}")
+    if failed:
+        raise click.Abort()
+
 if __name__ == '__main__':
     cli()
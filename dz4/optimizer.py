@@ -0,0 +1,163 @@
+from typing import Dict, List, NamedTuple, Tuple
+from instruction import (DecodedProgram, FIELD_LAYOUTS, INSTRUCTION_TYPES, InstructionType, PACKERS,
+                         bitreverse, decode_program)
+from interpreter import VirtualMachine
+
+LOAD_CONST = InstructionType.LOAD_CONST.value
+READ_MEMORY = InstructionType.READ_MEMORY.value
+WRITE_MEMORY = InstructionType.WRITE_MEMORY.value
+BITREVERSE = InstructionType.BITREVERSE.value
+
+# Наибольшие значения полей: константа LOAD_CONST и адрес в полях B и C
+MAX_CONST = (1 << FIELD_LAYOUTS[InstructionType.LOAD_CONST][1][1]) - 1
+MAX_ADDRESS_FIELD = (1 << FIELD_LAYOUTS[InstructionType.WRITE_MEMORY][1][1]) - 1
+
+# Команда оптимизатора: (код, b, c, d), как в столбцах DecodedProgram
+Command = Tuple[int, int, int, int]
+
+class Value(NamedTuple):
+    """Символьное значение ячейки при проходе по программе.
+
+    address is None - известная константа value. Иначе - значение, которое
+    ячейка address содержала в поколении value (номер записи в неё); значения
+    ячеек до начала программы неизвестны и имеют поколение 0.
+    """
+    address: object
+    value: int
+
+class OptimizationStats(NamedTuple):
+    instructions: int
+    optimized: int
+    folded: int      # команды, заменённые загрузкой константы
+    redundant: int   # записи значения, которое уже находится в ячейке
+    dead: int        # записи, перезаписанные до чтения
+
+def _accesses(op: int, b: int, c: int, d: int) -> Tuple[int, int]:
+    """Адрес источника и адрес результата команды (-1 - команда не читает память)."""
+    if op == LOAD_CONST:
+        return -1, b
+    if op == READ_MEMORY:
+        return c + d, b
+    if op == WRITE_MEMORY:
+        return b, c
+    return c, b
+
+def _copy(op: int, src: int, dest: int) -> Command:
+    # Копирование записывается командой исходного вида, если адрес помещается в поле
+    if op == WRITE_MEMORY and src <= MAX_ADDRESS_FIELD:
+        return WRITE_MEMORY, src, dest, 0
+    base = min(src, MAX_ADDRESS_FIELD)
+    return READ_MEMORY, dest, base, src - base
+
+def propagate(commands: List[Command]) -> Tuple[List[Command], int, int]:
+    """Прямой проход: свёртка констант, сокращение цепочек копирования и удаление
+    записей значения, которое уже находится в ячейке.
+
+    Начальное содержимое памяти не предполагается известным, поэтому
+    результат верен и при запуске со снимком памяти.
+    """
+    state: Dict[int, Value] = {}
+    generations: Dict[int, int] = {}
+    result = []
+    folded = redundant = 0
+
+    def current(address: int) -> Value:
+        return state.get(address) or Value(address, 0)
+
+    def location(value: Value, fallback: int) -> int:
+        # Ячейка, из которой можно прочитать значение: исходная, если её ещё не
+        # перезаписали, иначе источник самой команды
+        if value.address is not None and generations.get(value.address, 0) == value.value \
+                and current(value.address) == value:
+            return value.address
+        return fallback
+
+    for op, b, c, d in commands:
+        src, dest = _accesses(op, b, c, d)
+        if op == LOAD_CONST:
+            value = Value(None, c)
+        elif op == BITREVERSE:
+            source = current(src)
+            value = Value(None, bitreverse(source.value)) if source.address is None else None
+        else:
+            value = current(src)
+
+        if value is not None and current(dest) == value:
+            redundant += 1
+            continue
+
+        generation = generations.get(dest, 0) + 1
+        generations[dest] = generation
+        if value is None:
+            # Результат BITREV неизвестного значения - новое значение ячейки dest
+            # Поле C команды BITREV 12-битное: адрес, достижимый только через READ
+            # со смещением, в него не помещается, тогда читается исходный src
+            source_address = location(current(src), src)
+            command = (BITREVERSE, dest, source_address if source_address <= MAX_ADDRESS_FIELD else src, 0)
+            value = Value(dest, generation)
+        elif value.address is None and value.value <= MAX_CONST:
+            command = (LOAD_CONST, dest, value.value, 0)
+            folded += op != LOAD_CONST
+        elif value.address is None:
+            # Константа не помещается в поле C команды LOAD: команда остаётся как есть
+            command = (op, b, c, d)
+        else:
+            command = _copy(op, location(value, src), dest)
+        state[dest] = value
+        result.append(command)
+    return result, folded, redundant
+
+def eliminate_dead_stores(commands: List[Command]) -> List[Command]:
+    """Обратный проход: удаляет записи, перезаписанные до того, как их прочитали.
+
+    Вся память после выполнения считается наблюдаемой, поэтому последняя
+    запись в каждую ячейку сохраняется.
+    """
+    overwritten = set()
+    kept = []
+    for command in reversed(commands):
+        src, dest = _accesses(*command)
+        if dest in overwritten:
+            continue
+        kept.append(command)
+        overwritten.add(dest)
+        overwritten.discard(src)
+    kept.reverse()
+    return kept
+
+def optimize(decoded: DecodedProgram, memory_size: int = 4096) -> Tuple[List[Command], OptimizationStats]:
+    """Оптимизирует программу без переходов; результат оставляет память в том же состоянии.
+
+    Программы, обращающиеся за пределы памяти, не изменяются: УВМ такую
+    программу не загрузит, а удаление команд могло бы скрыть ошибку.
+    """
+    commands = list(zip(decoded.opcodes, decoded.b, decoded.c, decoded.d))
+    if any(max(_accesses(*command)) >= memory_size for command in commands):
+        return commands, OptimizationStats(len(commands), len(commands), 0, 0, 0)
+    propagated, folded, redundant = propagate(commands)
+    optimized = eliminate_dead_stores(propagated)
+    return optimized, OptimizationStats(len(commands), len(optimized), folded, redundant,
+                                        len(propagated) - len(optimized))
+
+def encode_commands(commands: List[Command]) -> bytes:
+    """Кодирует команды оптимизатора в бинарный формат программы."""
+    encoded = []
+    for op, b, c, d in commands:
+        operands = (b, c, d)[:len(FIELD_LAYOUTS[INSTRUCTION_TYPES[op]])]
+        encoded.append(PACKERS[op](*operands))
+    return b''.join(encoded)
+
+def optimize_program(binary_data: bytes, memory_size: int = 4096) -> Tuple[bytes, OptimizationStats]:
+    """Оптимизирует бинарную программу: возвращает новую программу и статистику."""
+    commands, stats = optimize(decode_program(binary_data), memory_size)
+    return encode_commands(commands), stats
+
+def compare_programs(original: bytes, optimized: bytes, memory_size: int = 4096) -> List[int]:
+    """Выполняет обе программы с обнулённой памятью и возвращает адреса, где результаты различаются."""
+    memories = []
+    for program in (original, optimized):
+        vm = VirtualMachine(memory_size)
+        vm.load_program(program)
+        vm.run()
+        memories.append(vm.memory)
+    return [address for address, (a, b) in enumerate(zip(*memories)) if a != b]
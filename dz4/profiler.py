@@ -0,0 +1,113 @@
+import time
+from collections import Counter, deque
+from typing import List, Optional, Tuple
+import yaml
+from instruction import DecodedProgram, FIELD_LAYOUTS, INSTRUCTION_TYPES, InstructionType
+
+def _addresses(decoded: DecodedProgram) -> Tuple[List[int], List[int]]:
+    """Адреса чтения и записи каждой инструкции (-1 - команда не читает память)."""
+    load_const = InstructionType.LOAD_CONST.value
+    read_memory = InstructionType.READ_MEMORY.value
+    write_memory = InstructionType.WRITE_MEMORY.value
+    reads, writes = [], []
+    for op, b, c, d in zip(decoded.opcodes, decoded.b, decoded.c, decoded.d):
+        if op == load_const:
+            reads.append(-1)
+            writes.append(b)
+        elif op == read_memory:
+            reads.append(c + d)
+            writes.append(b)
+        elif op == write_memory:
+            reads.append(b)
+            writes.append(c)
+        else:
+            reads.append(c)
+            writes.append(b)
+    return reads, writes
+
+class Profiler:
+    """Профилировщик исполнения программы на VirtualMachine.
+
+    Собирает число выполненных команд и суммарное время по типам команд,
+    гистограммы адресов чтения и записи и, если trace_size > 0, трассу
+    последних trace_size инструкций в кольцевом буфере. Используется через
+    vm.run(profiler): профилирующий цикл отдельный, поэтому обычный run
+    не платит за инструментирование.
+    """
+
+    def __init__(self, trace_size: int = 0):
+        self.counts = [0] * 64  # по коду команды
+        self.times = [0] * 64   # наносекунды по коду команды
+        self.reads = Counter()
+        self.writes = Counter()
+        self.trace = deque(maxlen=trace_size) if trace_size > 0 else None
+
+    def run(self, vm, end: Optional[int] = None) -> None:
+        """Выполняет программу vm с текущего pc до end, собирая статистику."""
+        code = vm.code
+        opcodes = vm.decoded.opcodes
+        reads, writes = _addresses(vm.decoded)
+        memory = vm.memory
+        counts, times = self.counts, self.times
+        read_counts, write_counts = self.reads, self.writes
+        trace = self.trace
+        clock = time.perf_counter_ns
+
+        end = len(code) if end is None else end
+        pc = vm.pc
+        try:
+            for pc in range(vm.pc, end):
+                op = opcodes[pc]
+                start = clock()
+                code[pc]()
+                times[op] += clock() - start
+                counts[op] += 1
+                if reads[pc] >= 0:
+                    read_counts[reads[pc]] += 1
+                write_counts[writes[pc]] += 1
+                if trace is not None:
+                    # Трасса: pc, код команды и записанное значение
+                    trace.append((pc, op, memory[writes[pc]]))
+        except Exception:
+            # pc указывает на инструкцию, вызвавшую ошибку
+            vm.pc = pc
+            raise
+        vm.pc = end
+
+    def report(self, vm=None, top: int = 10) -> dict:
+        """Сводка профиля; при переданной vm трасса дополняется операндами команд."""
+        opcodes = {}
+        for instruction_type in InstructionType:
+            count = self.counts[instruction_type.value]
+            if count:
+                seconds = self.times[instruction_type.value] / 1e9
+                opcodes[instruction_type.name] = {
+                    'count': count,
+                    'seconds': seconds,
+                    'ns_per_instruction': seconds * 1e9 / count,
+                }
+        result = {
+            'instructions': sum(self.counts),
+            'opcodes': opcodes,
+            'hot_reads': [{'address': a, 'count': n} for a, n in self.reads.most_common(top)],
+            'hot_writes': [{'address': a, 'count': n} for a, n in self.writes.most_common(top)],
+        }
+        if self.trace is not None:
+            result['trace'] = [self._trace_entry(vm, pc, op, value) for pc, op, value in self.trace]
+        return result
+
+    @staticmethod
+    def _trace_entry(vm, pc: int, op: int, value: int) -> dict:
+        instruction_type = INSTRUCTION_TYPES[op]
+        entry = {'pc': pc, 'command': instruction_type.name}
+        if vm is not None:
+            decoded = vm.decoded
+            operands = (decoded.b[pc], decoded.c[pc], decoded.d[pc])
+            entry['operands'] = list(operands[:len(FIELD_LAYOUTS[instruction_type])])
+        entry['value'] = value
+        return entry
+
+    def save(self, path: str, vm=None, top: int = 10) -> None:
+        """Сохраняет сводку профиля в YAML."""
+        with open(path, 'w') as f:
+            yaml.dump(self.report(vm, top), f, sort_keys=False)
@@ -0,0 +1,105 @@
+import os
+import tracemalloc
+import pytest
+import assembler
+from assembler import Assembler
+from interpreter import VirtualMachine
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def assemble_text(tmp_path, text, files=None):
+    for name, content in (files or {}).items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    source = tmp_path / 'main.asm'
+    source.write_text(text)
+    output = tmp_path / 'main.bin'
+    Assembler().assemble(str(source), str(output), str(tmp_path / 'main.log'))
+    return output.read_bytes()
+
+def run(program):
+    vm = VirtualMachine()
+    vm.load_program(program)
+    vm.run()
+    return vm.memory
+
+def test_test_program_matches_expected_output(tmp_path):
+    output, log = tmp_path / 'program.bin', tmp_path / 'assembly.log'
+    Assembler().assemble(os.path.join(HERE, 'test_program.asm'), str(output), str(log))
+    with open(os.path.join(HERE, 'program.bin'), 'rb') as f:
+        assert output.read_bytes() == f.read()
+    with open(os.path.join(HERE, 'assembly.log')) as f:
+        assert log.read_text() == f.read()
+
+def test_assemble_twice_on_one_instance(tmp_path):
+    assembler = Assembler()
+    source = tmp_path / 'main.asm'
+    source.write_text('start: LOAD 1, 2\nLOAD 2, start\n')
+    for _ in range(2):
+        assembler.assemble(str(source), str(tmp_path / 'main.bin'), str(tmp_path / 'main.log'))
+        assert len((tmp_path / 'main.bin').read_bytes()) == 12
+
+def test_labels_and_forward_references(tmp_path):
+    memory = run(assemble_text(tmp_path, 'start: LOAD 1, end - start\nLOAD 2, end\nLOAD 3, start\nend:\n'))
+    assert memory[1:4].tolist() == [3, 3, 0]
+
+def test_equ_constants_and_expressions(tmp_path):
+    memory = run(assemble_text(tmp_path, '.equ BASE, 100\nLOAD BASE + 1, LIMIT\nREAD BASE, BASE + 1\n'
+                                         '.equ LIMIT, (1 << 20) | 5\n'))
+    assert memory[100] == memory[101] == (1 << 20) | 5
+
+def test_macros(tmp_path):
+    text = ('.macro COPY2 src, dst\n    WRITE src, dst\n    WRITE src + 1, dst + 1\n.endm\n'
+            'LOAD 10, 7\nLOAD 11, 8\nCOPY2 10, 10 * 2\n')
+    memory = run(assemble_text(tmp_path, text))
+    assert memory[20:22].tolist() == [7, 8]
+
+def test_include(tmp_path):
+    memory = run(assemble_text(tmp_path, '.include "lib/defs.asm"\nLOAD BASE, 42\n',
+                               {'lib/defs.asm': '.equ BASE, 300\n'}))
+    assert memory[300] == 42
+
+def test_repeated_include_is_parsed_once_per_build(tmp_path, monkeypatch):
+    parsed = []
+    original = assembler.parse_source
+    monkeypatch.setattr(assembler, 'parse_source', lambda path: parsed.append(path) or original(path))
+    instance = Assembler()
+    library = tmp_path / 'lib.asm'
+    source = tmp_path / 'main.asm'
+    source.write_text('.include "lib.asm"\n.include "lib.asm"\n')
+    for value in (1, 2):
+        library.write_text(f'LOAD 5, {value}\n')
+        instance.assemble(str(source), str(tmp_path / 'main.bin'), str(tmp_path / 'main.log'))
+        assert run((tmp_path / 'main.bin').read_bytes())[5] == value
+        assert not instance.parse_cache
+    assert parsed == [str(library)] * 2
+
+def test_memory_does_not_grow_with_source_size(tmp_path):
+    peaks = []
+    for count in (2000, 8000):
+        source = tmp_path / 'big.asm'
+        source.write_text(''.join(f"LOAD {i % 4096}, {i}\n" for i in range(count)))
+        tracemalloc.start()
+        Assembler().assemble(str(source), str(tmp_path / 'big.bin'), str(tmp_path / 'big.log'), 'csv')
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert run((tmp_path / 'big.bin').read_bytes())[(count - 1) % 4096] == count - 1
+    # Инструкции не накапливаются: пик памяти не зависит от числа строк
+    assert peaks[1] < peaks[0] * 1.5
+
+def test_recursive_include(tmp_path):
+    with pytest.raises(ValueError, match='Recursive .include'):
+        assemble_text(tmp_path, '.include "main.asm"\n')
+
+def test_duplicate_symbol(tmp_path):
+    with pytest.raises(ValueError, match='Error at line 3: Duplicate symbol: start'):
+        assemble_text(tmp_path, 'start: LOAD 1, 2\n.equ X, 1\nstart: LOAD 2, 3\n')
+
+def test_errors_in_included_file_report_path(tmp_path):
+    with pytest.raises(ValueError, match=r'lib\.asm:2: LOAD expects 2 operands'):
+        assemble_text(tmp_path, '.include "lib.asm"\n', {'lib.asm': 'LOAD 1, 2\nLOAD 1\n'})
+
+def test_unknown_symbol(tmp_path):
+    with pytest.raises(ValueError, match='Unknown symbol: FOO'):
+        assemble_text(tmp_path, 'LOAD 1, FOO\n')
@@ -0,0 +1,73 @@
+import pytest
+import yaml
+from batch import BatchJob, collect_jobs, group_jobs, run_batch
+from benchmark import generate_program
+from instruction import Instruction, InstructionType, encode_instruction
+from interpreter import VirtualMachine
+
+def write_programs(directory, programs):
+    for name, program in programs.items():
+        (directory / name).write_bytes(program)
+
+def test_collect_jobs_from_directory(tmp_path):
+    write_programs(tmp_path, {'b.bin': b'', 'a.bin': b'', 'notes.txt': b''})
+    jobs = collect_jobs(str(tmp_path), 'out', '0-3')
+    assert jobs == [BatchJob(str(tmp_path / 'a.bin'), 'out/a.yaml', 0, 3),
+                    BatchJob(str(tmp_path / 'b.bin'), 'out/b.yaml', 0, 3)]
+    with pytest.raises(ValueError, match='--memory-range'):
+        collect_jobs(str(tmp_path), 'out')
+
+def test_collect_jobs_from_manifest(tmp_path):
+    manifest = tmp_path / 'manifest.yaml'
+    manifest.write_text(yaml.dump(['a.bin', {'binary': 'a.bin', 'memory_range': '5-6'},
+                                   {'binary': 'lib/b.bin', 'output': 'b.yaml'}]))
+    jobs = collect_jobs(str(manifest), 'out', '0-1')
+    assert jobs == [BatchJob(str(tmp_path / 'a.bin'), 'out/0000_a.yaml', 0, 1),
+                    BatchJob(str(tmp_path / 'a.bin'), 'out/0001_a.yaml', 5, 6),
+                    BatchJob(str(tmp_path / 'lib/b.bin'), 'out/b.yaml', 0, 1)]
+    with pytest.raises(ValueError, match='memory_range'):
+        collect_jobs(str(manifest), 'out')
+
+@pytest.mark.parametrize('manifest, message', [
+    ('- 5\n', 'Запись 0 манифеста должна быть строкой или словарём'),
+    ('- a.bin\n- [a.bin]\n', 'Запись 1 манифеста должна быть строкой или словарём'),
+    ('a.bin: 0-1\n', 'должен быть списком'),
+    ('- {memory_range: 0-1}\n', 'не содержит binary'),
+    ('- {binary: 5, memory_range: 0-1}\n', 'Поле binary записи 0'),
+    ('- {binary: a.bin, memory_range: 0-1, output: [x]}\n', 'Поле output записи 0'),
+])
+def test_malformed_manifest(tmp_path, manifest, message):
+    path = tmp_path / 'manifest.yaml'
+    path.write_text(manifest)
+    with pytest.raises(ValueError, match=message):
+        collect_jobs(str(path), 'out', '0-1')
+
+def test_group_jobs_deduplicates_by_content(tmp_path):
+    program = generate_program(50, seed=1)
+    write_programs(tmp_path, {'a.bin': program, 'copy.bin': program, 'b.bin': generate_program(50, seed=2)})
+    jobs = [BatchJob(str(tmp_path / name), f'{index}.yaml', 0, 1)
+            for index, name in enumerate(['a.bin', 'b.bin', 'copy.bin', 'missing.bin', 'missing.bin', 'a.bin'])]
+    assert group_jobs(jobs) == [[0, 2, 5], [1], [3], [4]]
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_run_batch_with_failing_program(tmp_path, workers):
+    good = generate_program(300, seed=3, memory_size=1024)
+    # BITREV читает адрес 4095 - за пределами памяти размером 1024
+    bad = encode_instruction(Instruction(InstructionType.BITREVERSE, [0, 4095]))
+    write_programs(tmp_path, {'good.bin': good, 'copy.bin': good, 'bad.bin': bad})
+    out = tmp_path / 'out'
+    jobs = [BatchJob(str(tmp_path / name), str(out / f'{name}.yaml'), 0, 9)
+            for name in ('good.bin', 'bad.bin', 'copy.bin', 'missing.bin')]
+    results = run_batch(jobs, workers, memory_size=1024)
+
+    assert [result['status'] for result in results] == ['ok', 'failed', 'ok', 'failed']
+    assert [result['shared'] for result in results] == [True, False, True, False]
+    assert results[1]['error'].startswith('IndexError: Инструкция 0 обращается к адресу 4095')
+    assert results[3]['error'].startswith('FileNotFoundError')
+    vm = VirtualMachine(1024)
+    vm.load_program(good)
+    vm.run()
+    for name in ('good.bin', 'copy.bin'):
+        dump = yaml.safe_load((out / f'{name}.yaml').read_text())
+        assert list(dump['values'].values()) == vm.memory[0:10].tolist()
+    assert not (out / 'bad.bin.yaml').exists()
@@ -0,0 +1,82 @@
+import os
+import random
+import pytest
+import compiler
+from benchmark import generate_program
+from compiler import CODE_CACHE_SIZE, MIN_BITREV_BATCH, cache_key, compile_program, generate_source
+from instruction import Instruction, InstructionType, decode_program, encode_instruction
+from interpreter import VirtualMachine
+
+def encode(*instructions):
+    return b''.join(encode_instruction(Instruction(instruction_type, list(operands)))
+                    for instruction_type, *operands in instructions)
+
+def bitrev_run(dest, src, length):
+    return [(InstructionType.BITREVERSE, dest + i, src + i) for i in range(length)]
+
+def with_random_memory(instructions, seed=0, cells=128):
+    # Ячейки заполняются случайными значениями, чтобы разворот битов был заметен
+    rng = random.Random(seed)
+    loads = [(InstructionType.LOAD_CONST, address, rng.randrange(1 << 25)) for address in range(cells)]
+    return encode(*loads, *instructions)
+
+def run(program, **options):
+    vm = VirtualMachine(**options)
+    vm.load_program(program)
+    vm.run()
+    return vm.memory
+
+@pytest.mark.parametrize('dest, src, length, batches', [
+    (64, 16, 10, ['mem[64:74] = bitreverse_words(mem[16:26])']),          # диапазоны не пересекаются
+    (20, 20, 8, ['mem[20:28] = bitreverse_words(mem[20:28])']),           # диапазоны совпадают
+    (20, 16, 10, ['mem[20:24] = bitreverse_words(mem[16:20])',            # пересечение: серия делится
+                  'mem[24:28] = bitreverse_words(mem[20:24])']),
+    (16, 20, 10, ['mem[16:20] = bitreverse_words(mem[20:24])',
+                  'mem[20:24] = bitreverse_words(mem[24:28])']),
+    (10, 8, 10, []),                                                      # сдвиг меньше MIN_BITREV_BATCH
+    (40, 80, MIN_BITREV_BATCH - 1, []),                                   # короткая серия
+])
+def test_bitrev_runs(dest, src, length, batches):
+    program = with_random_memory(bitrev_run(dest, src, length))
+    source = generate_source(decode_program(program))
+    assert [line.strip() for line in source.splitlines() if 'bitreverse_words' in line] == batches
+    assert run(program, compiled=True) == run(program)
+
+def test_compiled_matches_handlers():
+    for seed in range(5):
+        program = generate_program(3000, seed=seed, memory_size=256)
+        # Добавляются серии BITREV, которые компилируются в операции над срезами
+        program += encode(*bitrev_run(100, 30, 40), *bitrev_run(7, 7, 20), *bitrev_run(50, 45, 12))
+        assert run(program, compiled=True) == run(program)
+
+def test_reload_from_cache_dir(tmp_path, monkeypatch):
+    program = with_random_memory(bitrev_run(64, 0, 32), seed=3)
+    expected = run(program)
+    monkeypatch.setattr(compiler, '_code_cache', {})
+    assert run(program, compiled=True, cache_dir=str(tmp_path)) == expected
+    assert len(os.listdir(tmp_path)) == 1
+
+    # Второй запуск в новом процессе: кеш процесса пуст, код читается с диска без компиляции
+    monkeypatch.setattr(compiler, '_code_cache', {})
+    monkeypatch.setattr(compiler, 'generate_source', lambda decoded: pytest.fail('program recompiled'))
+    assert run(program, compiled=True, cache_dir=str(tmp_path)) == expected
+
+def test_unwritable_cache_dir_is_skipped(tmp_path):
+    cache_dir = tmp_path / '__uvmcache__'
+    cache_dir.write_text('')  # на месте каталога кеша - файл
+    program = generate_program(200, seed=1)
+    assert run(program, compiled=True, cache_dir=str(cache_dir)) == run(program)
+    assert cache_dir.read_text() == ''
+    assert os.listdir(tmp_path) == ['__uvmcache__']
+
+def test_code_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(compiler, '_code_cache', {})
+    programs = [generate_program(10, seed=seed) for seed in range(CODE_CACHE_SIZE + 5)]
+    for program in programs:
+        compile_program(program, decode_program(program))
+    assert len(compiler._code_cache) == CODE_CACHE_SIZE
+    # Повторно использованная программа не вытесняется первой
+    compile_program(programs[5], decode_program(programs[5]))
+    compile_program(programs[0], decode_program(programs[0]))
+    assert len(compiler._code_cache) == CODE_CACHE_SIZE
+    assert list(compiler._code_cache)[-2:] == [cache_key(programs[5]), cache_key(programs[0])]
@@ -0,0 +1,102 @@
+import random
+from array import array
+import pytest
+from assembler import Assembler
+from disassembler import disassemble
+from instruction import (INSTRUCTION_SIZE, Instruction, InstructionType, bitreverse, bitreverse_words,
+                         decode_instruction, decode_program, encode_instruction)
+
+# Команды test_program.asm и их байты из program.bin
+EXPECTED = [
+    (Instruction(InstructionType.LOAD_CONST, [31, 78]), 'FC 07 38 01 00 00'),
+    (Instruction(InstructionType.READ_MEMORY, [766, 33, 3]), 'A7 BF 84 C0 00 00'),
+    (Instruction(InstructionType.WRITE_MEMORY, [51, 19]), 'F5 0C 4C 00 00 00'),
+    (Instruction(InstructionType.BITREVERSE, [23, 5]), 'DC 05 14 00 00 00'),
+]
+
+def reference_bitreverse(value):
+    # Прежняя реализация через строку из 32 двоичных цифр
+    return int(f"{value & 0xFFFFFFFF:032b}"[::-1], 2)
+
+def random_program(count, seed):
+    rng = random.Random(seed)
+    instructions = []
+    for _ in range(count):
+        instruction_type = rng.choice(list(InstructionType))
+        if instruction_type == InstructionType.LOAD_CONST:
+            operands = [rng.randrange(1 << 12), rng.randrange(1 << 25)]
+        elif instruction_type == InstructionType.READ_MEMORY:
+            operands = [rng.randrange(1 << 12), rng.randrange(1 << 12), rng.randrange(1 << 5)]
+        else:
+            operands = [rng.randrange(1 << 12), rng.randrange(1 << 12)]
+        instructions.append(Instruction(instruction_type, operands))
+    return instructions
+
+@pytest.mark.parametrize('instruction, expected', EXPECTED)
+def test_encode_matches_specification(instruction, expected):
+    assert encode_instruction(instruction).hex(' ').upper() == expected
+    assert decode_instruction(bytes.fromhex(expected)) == instruction
+
+def test_encode_decode_round_trip():
+    for instruction in random_program(1000, seed=1):
+        encoded = encode_instruction(instruction)
+        assert len(encoded) == INSTRUCTION_SIZE
+        assert decode_instruction(encoded) == instruction
+
+def test_operands_are_masked_to_field_width():
+    # Лишние старшие биты операнда не попадают в соседние поля
+    encoded = encode_instruction(Instruction(InstructionType.READ_MEMORY, [(1 << 12) + 5, (1 << 12) + 6, (1 << 5) + 7]))
+    assert decode_instruction(encoded).operands == [5, 6, 7]
+    encoded = encode_instruction(Instruction(InstructionType.LOAD_CONST, [1, (1 << 25) + 9]))
+    assert decode_instruction(encoded).operands == [1, 9]
+
+def test_decode_program_matches_decode_instruction():
+    instructions = random_program(1000, seed=2)
+    data = b''.join(map(encode_instruction, instructions))
+    decoded = decode_program(data + b'\x3c\x00')  # неполная последняя команда игнорируется
+    assert len(decoded) == len(instructions)
+    for index, instruction in enumerate(instructions):
+        offset = index * INSTRUCTION_SIZE
+        assert decode_instruction(data[offset:offset + INSTRUCTION_SIZE]) == instruction
+        assert decoded.instruction(index) == instruction
+        assert decoded.d[index] == (instruction.operands[2] if len(instruction.operands) == 3 else 0)
+    assert decoded.instructions() == instructions
+
+def test_unknown_opcode():
+    with pytest.raises(ValueError, match='Unknown instruction type: 3f'):
+        decode_instruction(bytes([0x3F, 0, 0, 0, 0, 0]))
+    data = encode_instruction(EXPECTED[0][0]) + bytes([0x3F, 0, 0, 0, 0, 0])
+    with pytest.raises(ValueError, match=r'Unknown instruction type: 3f \(instruction 1\)'):
+        decode_program(data)
+
+@pytest.mark.parametrize('listing', [False, True])
+def test_disassemble_round_trip(tmp_path, listing):
+    data = b''.join(map(encode_instruction, random_program(500, seed=3)))
+    lines = disassemble(data, listing)
+    if listing:
+        assert lines[1].endswith(f"; {INSTRUCTION_SIZE:06X}: {data[6:12].hex(' ').upper()}")
+    source = tmp_path / 'program.asm'
+    source.write_text(''.join(f"{line}\n" for line in lines))
+    output = tmp_path / 'program.bin'
+    Assembler().assemble(str(source), str(output), str(tmp_path / 'assembly.log'))
+    assert output.read_bytes() == data
+
+def test_disassemble_test_program():
+    data = b''.join(bytes.fromhex(expected) for _, expected in EXPECTED)
+    assert disassemble(data) == ['LOAD 31, 78', 'READ 766, 33, 3', 'WRITE 51, 19', 'BITREV 23, 5']
+
+def test_bitreverse_matches_reference():
+    rng = random.Random(4)
+    values = [0, 1, 0x80000000, 0xFFFFFFFF, 0x12345678, 1 << 32, -1, (1 << 40) + 5]
+    values += [rng.randrange(1 << 32) for _ in range(10000)]
+    for value in values:
+        assert bitreverse(value) == reference_bitreverse(value)
+
+def test_bitreverse_words_matches_reference():
+    rng = random.Random(5)
+    values = array('I', [rng.randrange(1 << 32) for _ in range(1000)])
+    expected = [reference_bitreverse(value) for value in values]
+    assert bitreverse_words(values).tolist() == expected
+    assert bitreverse_words(memoryview(values)[10:20]).tolist() == expected[10:20]
+    with pytest.raises(ValueError, match='32-битные'):
+        bitreverse_words(array('H', [1, 2]))
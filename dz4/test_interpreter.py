@@ -0,0 +1,179 @@
+import csv
+import json
+import struct
+import pytest
+import yaml
+from benchmark import generate_program
+from instruction import Instruction, InstructionType, bitreverse, encode_instruction
+from interpreter import CHECKPOINT_HEADER, CHECKPOINT_MAGIC, CHECKPOINT_VERSION, VirtualMachine
+
+def encode(*instructions):
+    return b''.join(encode_instruction(Instruction(instruction_type, list(operands)))
+                    for instruction_type, *operands in instructions)
+
+# READ 5, 90, 20 читает ячейку 110
+PROGRAM = encode((InstructionType.LOAD_CONST, 110, 42), (InstructionType.WRITE_MEMORY, 3, 4),
+                 (InstructionType.READ_MEMORY, 5, 90, 20))
+
+def load(program, memory_size=4096):
+    vm = VirtualMachine(memory_size)
+    vm.load_program(program)
+    return vm
+
+@pytest.mark.parametrize('steps', [1, 777, 2000])
+def test_checkpoint_resume(tmp_path, steps):
+    program = generate_program(2000, seed=1)
+    expected = load(program)
+    expected.run()
+
+    vm = load(program)
+    vm.run(steps=steps)
+    assert vm.pc == steps
+    path = tmp_path / 'state.uvmc'
+    vm.save_checkpoint(str(path))
+
+    resumed = load(program)
+    resumed.load_checkpoint(str(path))
+    assert resumed.pc == steps and resumed.memory == vm.memory
+    resumed.run()
+    assert resumed.finished and resumed.memory == expected.memory
+
+def test_checkpoint_for_other_program(tmp_path):
+    vm = load(generate_program(100, seed=1))
+    vm.run(steps=10)
+    vm.save_checkpoint(str(tmp_path / 'state.uvmc'))
+    with pytest.raises(ValueError, match='другой программы'):
+        load(generate_program(100, seed=2)).load_checkpoint(str(tmp_path / 'state.uvmc'))
+
+def test_checkpoint_bad_magic(tmp_path):
+    program = generate_program(100, seed=1)
+    path = tmp_path / 'state.uvmc'
+    load(program).save_checkpoint(str(path))
+    data = bytearray(path.read_bytes())
+    data[:4] = b'XXXX'
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match='не является контрольной точкой'):
+        load(program).load_checkpoint(str(path))
+    path.write_bytes(b'UVMC')  # короче заголовка
+    with pytest.raises(ValueError, match='не является контрольной точкой'):
+        load(program).load_checkpoint(str(path))
+
+def test_checkpoint_truncated(tmp_path):
+    program = generate_program(100, seed=1)
+    path = tmp_path / 'state.uvmc'
+    load(program).save_checkpoint(str(path))
+    path.write_bytes(path.read_bytes()[:CHECKPOINT_HEADER.size + 100])
+    with pytest.raises(ValueError, match='обрезана'):
+        load(program).load_checkpoint(str(path))
+
+@pytest.fixture
+def finished_vm():
+    vm = load(generate_program(1000, seed=4))
+    vm.run()
+    return vm
+
+def test_dump_yaml_matches_yaml_dump(tmp_path, finished_vm):
+    path = tmp_path / 'dump.yaml'
+    finished_vm.dump_memory(10, 300, str(path), 'yaml')
+    values = finished_vm.memory[10:301].tolist()
+    expected = yaml.dump({'memory_range': {'start': 10, 'end': 300},
+                          'values': dict(enumerate(values, 10))}, sort_keys=False)
+    assert path.read_text() == expected
+
+def test_dump_json_csv_binary(tmp_path, finished_vm):
+    values = finished_vm.memory[5:51].tolist()
+    finished_vm.dump_memory(5, 50, str(tmp_path / 'dump.json'), 'json')
+    assert json.loads((tmp_path / 'dump.json').read_text()) == \
+        {'memory_range': {'start': 5, 'end': 50}, 'values': values}
+    finished_vm.dump_memory(5, 50, str(tmp_path / 'dump.csv'), 'csv')
+    with open(tmp_path / 'dump.csv', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows == [['address', 'value']] + [[str(a), str(v)] for a, v in enumerate(values, 5)]
+    finished_vm.dump_memory(5, 50, str(tmp_path / 'dump.bin'), 'binary')
+    assert list(struct.unpack(f'<{len(values)}I', (tmp_path / 'dump.bin').read_bytes())) == values
+
+def test_dump_errors(tmp_path, finished_vm):
+    with pytest.raises(ValueError, match='Неизвестный формат'):
+        finished_vm.dump_memory(0, 1, str(tmp_path / 'dump'), 'xml')
+    with pytest.raises(IndexError):
+        finished_vm.dump_memory(0, 4096, str(tmp_path / 'dump'), 'yaml')
+
+def test_read_past_memory_rejected_at_load():
+    with pytest.raises(IndexError, match='Инструкция 0 обращается к адресу 110 за пределами памяти размером 100'):
+        load(PROGRAM, memory_size=100)
+    # Адрес READ - сумма src + offset, каждое поле отдельно помещается в память
+    program = encode((InstructionType.LOAD_CONST, 1, 1), (InstructionType.READ_MEMORY, 5, 90, 20))
+    with pytest.raises(IndexError, match='Инструкция 1 обращается к адресу 110'):
+        load(program, memory_size=100)
+    vm = load(program, memory_size=111)
+    vm.run()
+    assert vm.memory[5] == 0
+
+def test_rejected_program_keeps_previous_state():
+    vm = load(PROGRAM, memory_size=111)
+    with pytest.raises(IndexError):
+        vm.load_program(encode((InstructionType.BITREVERSE, 1, 200)))
+    vm.run()
+    assert vm.memory[5] == 42
+
+def test_smaller_snapshot_revalidates(tmp_path):
+    vm = load(PROGRAM)
+    path = tmp_path / 'small.snapshot'
+    path.write_bytes(bytes(4 * 100))
+    with pytest.raises(IndexError, match='адресу 110'):
+        vm.load_snapshot(str(path))
+    assert len(vm.memory) == 4096
+    path.write_bytes(bytes(4 * 111))
+    vm.load_snapshot(str(path))
+    vm.run()
+    assert len(vm.memory) == 111 and vm.memory[5] == 42
+
+def test_smaller_checkpoint_revalidates(tmp_path):
+    vm = load(PROGRAM)
+    path = tmp_path / 'small.uvmc'
+    path.write_bytes(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, 0, 100, vm.program_hash)
+                     + bytes(4 * 100))
+    with pytest.raises(IndexError, match='адресу 110'):
+        vm.load_checkpoint(str(path))
+    assert len(vm.memory) == 4096
+
+def test_snapshot_round_trip(tmp_path, finished_vm):
+    path = tmp_path / 'memory.snapshot'
+    finished_vm.save_snapshot(str(path))
+    assert path.read_bytes() == struct.pack(f'<{len(finished_vm.memory)}I', *finished_vm.memory)
+    vm = VirtualMachine()
+    vm.load_snapshot(str(path))
+    assert vm.memory.tolist() == finished_vm.memory.tolist()
+
+def test_snapshot_copy_on_write(tmp_path):
+    path = tmp_path / 'memory.snapshot'
+    data = struct.pack('<200I', *range(200))
+    path.write_bytes(data)
+    vm = load(PROGRAM)
+    vm.load_snapshot(str(path))
+    vm.run()
+    assert vm.memory[5] == 42 and vm.memory[4] == 3
+    assert path.read_bytes() == data
+
+    # С writable=True изменения попадают в файл
+    vm = load(PROGRAM)
+    vm.load_snapshot(str(path), writable=True)
+    vm.run()
+    assert struct.unpack('<200I', path.read_bytes())[110] == 42
+
+@pytest.mark.parametrize('size', [0, 6, 401])
+def test_snapshot_size_must_be_whole_words(tmp_path, size):
+    path = tmp_path / 'memory.snapshot'
+    path.write_bytes(bytes(size))
+    with pytest.raises(ValueError, match='не кратен 4'):
+        VirtualMachine().load_snapshot(str(path))
+
+def test_bitreverse_range(finished_vm):
+    memory = finished_vm.memory.tolist()
+    finished_vm.bitreverse_range(100, 90, 20)  # диапазоны пересекаются: источник читается до записи
+    assert finished_vm.memory[100:120].tolist() == [bitreverse(value) for value in memory[90:110]]
+    assert finished_vm.memory[:100].tolist() == memory[:100]
+    finished_vm.bitreverse_range(4090, 0, 6)
+    for dest, src, count in [(4091, 0, 6), (0, 4091, 6), (-1, 0, 2), (0, -1, 2)]:
+        with pytest.raises(IndexError, match='bitreverse'):
+            finished_vm.bitreverse_range(dest, src, count)
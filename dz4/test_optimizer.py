@@ -0,0 +1,64 @@
+import random
+from array import array
+import pytest
+from instruction import Instruction, InstructionType, encode_instruction
+from interpreter import VirtualMachine
+from optimizer import optimize_program
+
+def assemble(commands):
+    return b''.join(encode_instruction(Instruction(t, list(operands))) for t, operands in commands)
+
+def run(program, initial):
+    vm = VirtualMachine(len(initial))
+    vm.memory[:] = array(vm.memory.typecode, initial)
+    vm.load_program(program)
+    vm.run()
+    return vm.memory.tolist()
+
+def random_program(rng, count, addresses):
+    commands = []
+    for _ in range(count):
+        kind = rng.choice(list(InstructionType))
+        if kind == InstructionType.LOAD_CONST:
+            operands = [rng.choice(addresses), rng.choice([0, 1, 5, 1 << 24, rng.randrange(1 << 25)])]
+        elif kind == InstructionType.READ_MEMORY:
+            operands = [rng.choice(addresses), rng.choice(addresses), rng.randrange(32)]
+        else:
+            operands = [rng.choice(addresses), rng.choice(addresses)]
+        commands.append((kind, operands))
+    return assemble(commands)
+
+def test_bitrev_source_beyond_address_field():
+    # Значение ячейки 4100 доступно только через READ со смещением
+    program = assemble([(InstructionType.READ_MEMORY, [5, 4095, 5]),
+                        (InstructionType.BITREVERSE, [6, 5])])
+    initial = [0] * 8192
+    initial[4100] = 1
+    optimized, _ = optimize_program(program, 8192)
+    assert run(optimized, initial) == run(program, initial)
+
+def test_folds_constants_and_removes_dead_stores():
+    program = assemble([(InstructionType.LOAD_CONST, [10, 5]),
+                        (InstructionType.WRITE_MEMORY, [10, 11]),
+                        (InstructionType.LOAD_CONST, [10, 7])])
+    optimized, stats = optimize_program(program)
+    assert stats.optimized == 2 and stats.folded == 1 and stats.dead == 1
+    assert run(optimized, [0] * 16) == run(program, [0] * 16)
+
+@pytest.mark.parametrize('memory_size', [64, 4096, 8192])
+def test_random_programs_equivalent(memory_size):
+    rng = random.Random(memory_size)
+    # Небольшой набор адресов даёт много совпадений; адреса у границы 12-битного
+    # поля вместе со смещением READ выходят за 4095
+    addresses = [0, 1, 2, 3, 5, 8, 13, 21] + ([4090, 4095] if memory_size > 4096 else [])
+    for _ in range(100):
+        program = random_program(rng, rng.choice([10, 100, 500]), addresses)
+        optimized, stats = optimize_program(program, memory_size)
+        for initial in ([0] * memory_size, [rng.randrange(1 << 32) for _ in range(memory_size)]):
+            try:
+                expected = run(program, initial)
+            except IndexError:
+                # Программа не загружается в память такого размера и не изменяется
+                assert optimized == program
+                continue
+            assert run(optimized, initial) == expected
@@ -0,0 +1,58 @@
+import yaml
+from instruction import Instruction, InstructionType, encode_instruction
+from interpreter import VirtualMachine
+from profiler import Profiler
+
+def encode(*instructions):
+    return b''.join(encode_instruction(Instruction(instruction_type, list(operands)))
+                    for instruction_type, *operands in instructions)
+
+PROGRAM = encode(
+    (InstructionType.LOAD_CONST, 10, 7),
+    (InstructionType.LOAD_CONST, 11, 8),
+    (InstructionType.WRITE_MEMORY, 10, 20),    # 20 <- 10
+    (InstructionType.READ_MEMORY, 21, 5, 5),   # 21 <- 10
+    (InstructionType.BITREVERSE, 22, 10),      # 22 <- bitreverse(10)
+    (InstructionType.WRITE_MEMORY, 11, 20),    # 20 <- 11
+)
+
+def profile(trace_size=0, steps=None):
+    vm = VirtualMachine()
+    vm.load_program(PROGRAM)
+    profiler = Profiler(trace_size)
+    vm.run(profiler, steps=steps)
+    return vm, profiler
+
+def test_counts_and_histograms():
+    vm, profiler = profile()
+    plain = VirtualMachine()
+    plain.load_program(PROGRAM)
+    plain.run()
+    assert vm.memory == plain.memory and vm.finished
+
+    report = profiler.report(vm)
+    assert report['instructions'] == 6
+    assert {name: entry['count'] for name, entry in report['opcodes'].items()} == \
+        {'LOAD_CONST': 2, 'READ_MEMORY': 1, 'WRITE_MEMORY': 2, 'BITREVERSE': 1}
+    assert profiler.reads == {10: 3, 11: 1}
+    assert profiler.writes == {10: 1, 11: 1, 20: 2, 21: 1, 22: 1}
+    assert report['hot_reads'][0] == {'address': 10, 'count': 3}
+    assert report['hot_writes'][0] == {'address': 20, 'count': 2}
+    assert 'trace' not in report
+
+def test_trace_is_bounded(tmp_path):
+    vm, profiler = profile(trace_size=2)
+    assert len(profiler.trace) == 2
+    report = profiler.report(vm)
+    assert report['trace'] == [
+        {'pc': 4, 'command': 'BITREVERSE', 'operands': [22, 10], 'value': vm.memory[22]},
+        {'pc': 5, 'command': 'WRITE_MEMORY', 'operands': [11, 20], 'value': 8},
+    ]
+    profiler.save(str(tmp_path / 'profile.yaml'), vm)
+    assert yaml.safe_load((tmp_path / 'profile.yaml').read_text())['trace'] == report['trace']
+
+def test_profile_with_steps():
+    vm, profiler = profile(steps=3)
+    assert vm.pc == 3 and sum(profiler.counts) == 3
+    vm.run(profiler)
+    assert vm.finished and sum(profiler.counts) == 6